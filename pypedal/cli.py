@@ -36,6 +36,7 @@ Pattern syntax:
     N: command          Shorthand for Nv,N^ (button press and release)
     2v,2^: command      Execute when button 2 pressed and released (see max_use)
     Nv repeat: command  Execute repeatedly while button N held (rate set via --repeat-rate)
+    Nv async: command   Execute without waiting for earlier commands to finish
 
 \b
 Example config file:
@@ -86,7 +87,7 @@ Note: Release-only events (^) must have corresponding press events (v).
     except PermissionError as e:
         raise click.ClickException(str(e))
     finally:
-        manager.close_all_devices()
+        manager.close()
 
 if __name__ == '__main__':
     main()
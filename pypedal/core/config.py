@@ -3,15 +3,53 @@ Configuration and command pattern handling for pedal device
 """
 import os
 import re
-from dataclasses import dataclass
-from typing import List, Optional, Tuple, Dict
+import shlex
+import shutil
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple, Dict
 from datetime import datetime
 from evdev import ecodes
 from .pedal import ButtonEvent, Button
-from .history import HistoryEntry
+from .history import DATACLASS_SLOTS, HistoryEntry
 from pprint import pprint
 
-@dataclass
+# Characters that need /bin/sh to interpret a command line
+SHELL_METACHARACTERS = set('|&;<>()$`\\*?[]{}~!\n')
+
+def parse_argv(command: str) -> Optional[Tuple[List[str], str]]:
+    """
+    Split a command into argv when it can run without a shell
+
+    Commands containing shell syntax (pipes, redirection, variables, globs,
+    environment assignments, ...) or naming a program that is not on PATH
+    return None and must be run through /bin/sh.
+
+    Args:
+        command: Command string from the configuration
+
+    Returns:
+        Tuple of (argument list, absolute program path) for direct execution,
+        or None if a shell is required
+    """
+    if not command or SHELL_METACHARACTERS.intersection(command):
+        return None
+
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        return None
+
+    if not argv or '=' in argv[0]:
+        return None
+
+    executable = shutil.which(argv[0])
+    if executable is None:
+        return None
+
+    return argv, executable
+
+@dataclass(**DATACLASS_SLOTS)
 class EventMapping:
     """Maps input event type/code/value to button number"""
     event_type: int
@@ -26,6 +64,7 @@ class DeviceConfig:
     path: str
     mappings: List[EventMapping]
     shared: bool = False
+    debounce: float = 0.0
 
     def get_key_code_map(self) -> Dict[Tuple[int, int, int], Tuple[Button, bool]]:
         """
@@ -55,7 +94,7 @@ class DeviceConfig:
                 seen.add(mapping.button)
         return buttons
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class ButtonEventPatternElement:
     """
     Represents a single button event element in a sequence
@@ -82,6 +121,30 @@ class ButtonEventPatternElement:
         return (history_entry.button == self.button and 
                 history_entry.event == self.event)
 
+def compile_matcher(sequence: List[ButtonEventPatternElement]) -> Callable[[List[HistoryEntry]], bool]:
+    """
+    Generate a max_use check specialized for one pattern sequence
+
+    The (button, event) sequence is matched by Config.get_patterns_by_keys,
+    so only the max_use limits are left; they are inlined as constants and
+    checked by a single boolean expression. The history must already have
+    the same length as the sequence.
+
+    Args:
+        sequence: Pattern elements whose max_use limits to check
+
+    Returns:
+        Function taking the history entry list and returning True if no
+        entry is used more often than its element allows
+    """
+    terms = [f"h[{j}].used <= {int(element.max_use)}"
+             for j, element in enumerate(sequence) if element.max_use is not None]
+
+    source = "def _match(h):\n    return " + (" and ".join(terms) or "True") + "\n"
+    namespace = {}
+    exec(compile(source, f"<pattern {','.join(map(str, sequence))}>", 'exec'), namespace)
+    return namespace['_match']
+
 @dataclass
 class ButtonEventPattern:
     """
@@ -97,6 +160,26 @@ class ButtonEventPattern:
     command: str = ""
     line_number: int = 0
     repeat: bool = False
+    async_: bool = False
+    argv: Optional[List[str]] = field(default=None, init=False, repr=False, compare=False)
+    executable: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    event_keys: Tuple[Tuple[int, ButtonEvent], ...] = field(default=(), init=False, repr=False,
+                                                            compare=False)
+    usage_match: Optional[Callable[[List[HistoryEntry]], bool]] = field(default=None, init=False,
+                                                                        repr=False, compare=False)
+
+    def __post_init__(self):
+        # Pre-split once so firing the pattern can skip the shell
+        # An absolute program path lets subprocess launch it via posix_spawn()
+        parsed = parse_argv(self.command)
+        if parsed is not None:
+            self.argv, self.executable = parsed
+        # Flat (button, event) tuple for matching without max_use limits
+        self.event_keys = tuple((int(element.button), element.event) for element in self.sequence)
+        # Only max_use limits are left to check once event_keys matched;
+        # None when no element has a limit
+        if any(element.max_use is not None for element in self.sequence):
+            self.usage_match = compile_matcher(self.sequence)
 
     def __str__(self) -> str:
         pattern = self.sequence_str()
@@ -118,6 +201,10 @@ class Config:
         self.mtime: float = 0.0
         self.patterns: List[ButtonEventPattern] = []
         self.devices: List[DeviceConfig] = []
+        # Bumped whenever patterns change to invalidate derived indexes
+        self.version: int = 0
+        self.patterns_by_keys: Dict[Tuple[Tuple[Button, ButtonEvent], ...], List[ButtonEventPattern]] = {}
+        self.patterns_by_keys_version: int = -1
         if config_file and os.path.exists(config_file):
             self.load(config_file)
 
@@ -127,6 +214,36 @@ class Config:
     def __repr__(self) -> str:
         return str(self)
 
+    def get_patterns_by_keys(self, event_keys: Tuple[Tuple[Button, ButtonEvent], ...]) -> List[ButtonEventPattern]:
+        """
+        Get patterns whose (button, event) sequence equals event_keys
+
+        A pattern can only match a history with exactly its own sequence of
+        button events, so one hash lookup on History.event_keys replaces
+        trying every pattern; only time and usage checks remain.
+
+        The index is rebuilt lazily when version changes, so code that
+        modifies patterns after the first lookup must increment version.
+
+        Args:
+            event_keys: (button, event) pairs of the whole history
+
+        Returns:
+            Patterns with that exact sequence, in configuration order
+        """
+        if self.patterns_by_keys_version != self.version:
+            self.build_indexes()
+
+        return self.patterns_by_keys.get(event_keys, [])
+
+    def build_indexes(self) -> None:
+        """Rebuild the pattern lookup index for the current version"""
+        patterns_by_keys = defaultdict(list)
+        for pattern in self.patterns:
+            patterns_by_keys[pattern.event_keys].append(pattern)
+        self.patterns_by_keys = dict(patterns_by_keys)
+        self.patterns_by_keys_version = self.version
+
     def get_next_button_number(self) -> int:
         """
         Calculate next available button number from configured devices
@@ -141,16 +258,20 @@ class Config:
                     next_button = button + 1
         return next_button
 
-    def load_device_config(self, line: str, next_button: int) -> Tuple[bool, int]:
+    def load_device_config(self, line: str, next_button: int, line_number: int = 0) -> Tuple[bool, int]:
         """
         Parse device configuration line if present
 
         Args:
             line: Configuration line to parse
             next_button: Next available button number
+            line_number: Line number for error messages
 
         Returns:
             Tuple of (success, next_button) where success indicates if line was parsed
+
+        Raises:
+            ValueError: If the debounce option is not a number of milliseconds
         """
         dev_match = re.match(r'^dev:\s*([^\s]+)\s*\[([^\]]+)\](?:\s*\[shared\])?', line)
         if not dev_match:
@@ -159,6 +280,16 @@ class Config:
         device_path = dev_match.group(1)
         mappings_str = dev_match.group(2)
         shared = bool(re.search(r'\[shared\]', line))
+        # Debounce interval is given in milliseconds and stored in seconds
+        debounce = 0.0
+        debounce_match = re.search(r'\[debounce=([^\]]*)\]', line)
+        if debounce_match:
+            if not re.fullmatch(r'\d+(?:\.\d+)?', debounce_match.group(1)):
+                raise ValueError(
+                    f"{self.config_file}:{line_number}: "
+                    f"invalid debounce '{debounce_match.group(1)}' (expected milliseconds, e.g. [debounce=5])"
+                )
+            debounce = float(debounce_match.group(1)) / 1000
 
         mappings = []
 
@@ -218,7 +349,8 @@ class Config:
         self.devices.append(DeviceConfig(
             path=device_path,
             mappings=mappings,
-            shared=shared
+            shared=shared,
+            debounce=debounce
         ))
         return True, next_button
 
@@ -227,12 +359,12 @@ class Config:
         Load a single configuration line
 
         Handles formats:
-        1. "dev: /dev/input/eventX [code1,code2,...]" - Device configuration
+        1. "dev: /dev/input/eventX [code1,code2,...] [shared] [debounce=MS]" - Device configuration
         2. "1v,2: command" - Explicit multi-button sequence
         3. "1: command" - Implicit single button press-release
         4. "2v,2^: command" - Explicit press-release sequence
         """
-        parsed, _ = self.load_device_config(line, self.get_next_button_number())
+        parsed, _ = self.load_device_config(line, self.get_next_button_number(), line_number)
         if parsed:
             return
 
@@ -244,12 +376,19 @@ class Config:
         pattern_str = match.group(1).strip()
         command = match.group(2).split('#')[0].strip()
 
-        # Extract repeat modifier before parsing timing constraint
+        # Extract repeat/async modifiers before parsing timing constraint
         repeat = False
-        repeat_match = re.search(r'\s+repeat\s*$', pattern_str)
-        if repeat_match:
-            repeat = True
-            pattern_str = pattern_str[:repeat_match.start()].strip()
+        async_ = False
+        modifier_match = re.search(r'(?:\s+(?:repeat|async))+\s*$', pattern_str)
+        if modifier_match:
+            modifiers = modifier_match.group(0).split()
+            repeat = 'repeat' in modifiers
+            async_ = 'async' in modifiers
+            pattern_str = pattern_str[:modifier_match.start()].strip()
+
+        # Repeat commands never block the event loop
+        if repeat:
+            async_ = True
 
         # Match pattern for timing constraint
         timing_match = re.match(r'^(.*?)(?:\s*<\s*([0-9.]+))?$', pattern_str)
@@ -283,7 +422,9 @@ class Config:
                                                           max_use=0))
 
         if sequence:
-            self.patterns.append(ButtonEventPattern(sequence, time_constraint, command, line_number, repeat))
+            self.patterns.append(ButtonEventPattern(sequence, time_constraint, command, line_number,
+                                                    repeat, async_))
+            self.version += 1
 
     def validate_button_references(self) -> None:
         """
@@ -332,6 +473,7 @@ class Config:
         current_mtime = os.stat(self.config_file).st_mtime
         if current_mtime != self.mtime:
             self.patterns.clear()
+            self.version += 1
             self.devices.clear()
             self.load(self.config_file)
             return True
@@ -1,22 +1,74 @@
 """
 Pedal device event handling functionality
 """
+import math
 import os
+import selectors
+import struct
 import subprocess
 import time
 import click
-from typing import Optional, List, Dict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, List, Dict, Tuple
 from evdev import InputDevice, ecodes
 from .pedal import PedalState, ButtonEvent, Button
 from .history import History
 from .config import Config, ButtonEventPattern
 
+# Kernel struct input_event: struct timeval time; __u16 type; __u16 code; __s32 value
+EVENT_STRUCT = struct.Struct('llHHi')
+EVENT_SIZE = EVENT_STRUCT.size
+unpack_event = EVENT_STRUCT.unpack_from
+# Offset of the type field, directly after struct timeval
+TYPE_OFFSET = struct.calcsize('ll')
+
+# Maximum number of input events read per syscall
+READ_BATCH = 32
+
+# Maximum number of queued synchronous commands, and separately of running
+# asynchronous ones, before new ones are dropped
+MAX_PENDING_COMMANDS = 8
+
+EV_KEY = ecodes.EV_KEY
+
+BUTTON_DOWN = ButtonEvent.BUTTON_DOWN
+BUTTON_UP = ButtonEvent.BUTTON_UP
+# Button event indexed by the press/release event value (0 or 1)
+BUTTON_EVENTS = (BUTTON_UP, BUTTON_DOWN)
+
+def build_key_table(key_codes: Dict) -> Tuple[int, List[Optional[Tuple[Button, bool]]]]:
+    """
+    Build a dense lookup table for EV_KEY press/release mappings
+
+    Key codes of one device form a small dense range, so a list indexed
+    by ((code - base) << 1) | value replaces hashing a (type, code, value)
+    tuple for the common EV_KEY events. Other mappings stay in key_codes.
+
+    Args:
+        key_codes: Mapping of (type,code,value) tuples to (button,auto_release) tuples
+
+    Returns:
+        Tuple of (base key code, table), table empty if there are no EV_KEY mappings
+    """
+    keys = [(code, value) for (event_type, code, value) in key_codes
+            if event_type == EV_KEY and value in (0, 1)]
+    if not keys:
+        return 0, []
+
+    base = min(code for code, _ in keys)
+    table = [None] * (((max(code for code, _ in keys) - base) << 1) + 2)
+    for code, value in keys:
+        table[((code - base) << 1) | value] = key_codes[(EV_KEY, code, value)]
+
+    return base, table
+
 class DeviceHandler:
     """Handles reading and processing pedal device events"""
 
     def __init__(self, device_path: str, key_codes: Dict, buttons: List[Button],
                  config: Config = None, quiet: bool = False, history: History = None,
-                 pedal_state: PedalState = None, shared: bool = False):
+                 pedal_state: PedalState = None, shared: bool = False, repeat_rate: float = 0.1,
+                 executor: ThreadPoolExecutor = None, debounce: float = 0.0):
         """
         Initialize device handler
 
@@ -29,14 +81,47 @@ class DeviceHandler:
             history: Shared history for pattern matching
             pedal_state: Shared state for button tracking
             shared: Allow other programs to see device events
+            repeat_rate: Seconds between repeat fires for patterns marked with repeat
+            executor: Single-worker executor for synchronous commands, shared by
+                      all handlers of a MultiDeviceHandler so their commands run
+                      in match order; a standalone handler gets its own, which
+                      only orders its own commands
+            debounce: Seconds after an accepted change of a button during which
+                      further changes are held back; the state at the end of
+                      the interval is applied then
         """
         self.device_path = device_path
         self.key_codes = key_codes
+        # Event types with at least one mapping; everything else (EV_SYN, EV_MSC, ...) is dropped unread
+        self.event_types = {key[0] for key in key_codes}
+        self.key_base, self.key_table = build_key_table(key_codes)
         self.config = config
         self.quiet = quiet
         self.shared = shared
+        self.repeat_rate = repeat_rate
+        self.debounce = debounce
+        # Event time of the last accepted press/release per button
+        self.last_change: Dict[Button, float] = {}
+        # Latest held back value per button as (value, window end in event
+        # time, window end in monotonic time)
+        self.debounce_pending: Dict[Button, Tuple[int, float, float]] = {}
+        # Monotonic time the first held back change is due, inf if none
+        self.debounce_deadline: float = math.inf
         self.device: Optional[InputDevice] = None
-        self.last_repeat_time: Optional[float] = None
+        # Monotonic time of the next repeat fire, inf while no repeat is armed
+        self.repeat_deadline: float = math.inf
+        self.children: List[subprocess.Popen] = []
+        # Synchronous commands run one at a time, in order, off the event loop
+        self.executor = executor if executor is not None else ThreadPoolExecutor(max_workers=1)
+        self.pending: List[Future] = []
+        # Last repeat lookup, valid while (history.version, config.version) is unchanged
+        self.repeat_cache_key: Optional[Tuple[int, int]] = None
+        self.repeat_cache: List[ButtonEventPattern] = []
+
+        # Preallocated buffer for raw input_event reads
+        self._buf = bytearray(EVENT_SIZE * READ_BATCH)
+        self._mv = memoryview(self._buf)
+        self._types = self._mv.cast('H')
 
         if pedal_state is not None:
             self.pedal_state = pedal_state
@@ -112,6 +197,96 @@ class DeviceHandler:
         except (OSError, IOError, PermissionError):
             return False
 
+    def run_command(self, pattern: ButtonEventPattern) -> None:
+        """
+        Execute the command for a matched pattern
+
+        Asynchronous patterns are started without waiting so a slow command
+        cannot stall event processing. All other patterns are queued on the
+        single-worker executor, so they still run one at a time in the order
+        they matched while the event loop keeps reading the device. Exit
+        status of both is collected later by reap_children(). If
+        MAX_PENDING_COMMANDS synchronous commands are queued behind a stuck
+        one, or as many asynchronous ones are still running (a held repeat
+        pattern whose command outlives the repeat rate), new ones are
+        dropped with a warning.
+
+        Simple commands pre-split at config load (pattern.argv) are executed
+        directly, skipping the intermediate /bin/sh process. Commands are
+        started with close_fds=False and an absolute executable so that
+        subprocess uses posix_spawn() (vfork+exec) instead of fork(); this
+        is safe because our own descriptors are close-on-exec (PEP 446).
+
+        Args:
+            pattern: Matched pattern whose command should run
+        """
+        if pattern.argv is not None:
+            args, shell, executable = pattern.argv, False, pattern.executable
+        else:
+            args, shell, executable = pattern.command, True, None
+
+        if len(self.children if pattern.async_ else self.pending) >= MAX_PENDING_COMMANDS:
+            self.reap_children()
+            if len(self.children if pattern.async_ else self.pending) >= MAX_PENDING_COMMANDS:
+                click.secho(f"  Warning: Too many pending commands, dropping: {pattern.command}", fg="yellow", err=True)
+                return
+
+        if pattern.async_:
+            self.children.append(subprocess.Popen(args, shell=shell, executable=executable, close_fds=False))
+            return
+
+        self.pending.append(self.executor.submit(
+            subprocess.run, args, shell=shell, executable=executable, close_fds=False, check=True))
+
+    def wait_for_commands(self) -> None:
+        """
+        Block until all queued synchronous commands have finished
+
+        Failures are reported as by reap_children().
+        """
+        for future in self.pending:
+            try:
+                future.result()
+            except Exception:
+                pass
+        self.reap_children()
+
+    def reap_children(self) -> None:
+        """
+        Collect exit status of finished commands
+
+        Called from the idle tick of the event loop. Commands still running
+        or queued are kept for the next call; failures are reported.
+        """
+        if self.pending:
+            pending = []
+            for future in self.pending:
+                if not future.done():
+                    pending.append(future)
+                    continue
+                error = future.exception()
+                if error is None or self.quiet:
+                    continue
+                if isinstance(error, subprocess.CalledProcessError):
+                    command = error.cmd if isinstance(error.cmd, str) else " ".join(error.cmd)
+                    click.secho(f"  Warning: Command failed (exit code {error.returncode}): {command}", fg="yellow", err=True)
+                else:
+                    click.secho(f"  Warning: Command failed: {error}", fg="yellow", err=True)
+            self.pending = pending
+
+        if not self.children:
+            return
+
+        running = []
+        for proc in self.children:
+            returncode = proc.poll()
+            if returncode is None:
+                running.append(proc)
+            elif returncode != 0 and not self.quiet:
+                command = proc.args if isinstance(proc.args, str) else " ".join(proc.args)
+                click.secho(f"  Warning: Command failed (exit code {returncode}): {command}", fg="yellow", err=True)
+        self.children = running
+
     def find_matching_patterns(self) -> List[ButtonEventPattern]:
         """
         Find patterns that match the current button event sequence to determine which command to execute.
@@ -136,45 +311,53 @@ class DeviceHandler:
 
         matching_patterns = []
         history = self.history.entries
-        history_len = len(history)
+        time_diff = self.history.time_span()
+
+        # Only patterns with exactly the history's button/event sequence can
+        # match, so complete patterns are found with one lookup, e.g. "1v,2v"
+        # needs button 1 held while 2 pressed
+        for pattern in self.config.get_patterns_by_keys(self.history.event_keys):
+            # Time between button presses must be within constraint
+            # Critical for patterns requiring quick combinations
+            if time_diff > pattern.time_constraint:
+                continue
 
-        # Check each history entry against pattern sequences
-        for i in range(history_len):
-            if i > 0:
-                time_diff = (history[i].timestamp - history[0].timestamp).total_seconds()
+            # Usage limits handle single vs multi-button patterns:
+            #   max_use=0 prevents single buttons combining with longer sequences
+            #   max_use=None allows multi-button combinations
+            usage_match = pattern.usage_match
+            if usage_match is None or usage_match(history):
+                matching_patterns.append(pattern)
 
-            # Check each pattern
-            for pattern in self.config.patterns:
-                # Must match complete patterns only, not partial sequences
-                if len(pattern.sequence) != history_len:
-                    continue
+        return matching_patterns
 
-                # Time between button presses must be within constraint
-                # Critical for patterns requiring quick combinations
-                if i > 0 and time_diff > pattern.time_constraint:
-                    continue
+    def find_first_matching_pattern(self) -> Optional[ButtonEventPattern]:
+        """
+        Find the first pattern matching the current history
 
-                # Check all history entries up to current index
-                matches = True
-                for j in range(i + 1):
-                    # Button numbers and press/release types must match exactly
-                    # e.g. "1v,2v" needs button 1 held while 2 pressed
-                    if not pattern.sequence[j].matches(history[j]):
-                        matches = False
-                        break
-
-                    # Check usage limits to handle single vs multi-button patterns
-                    # max_use=0 prevents single buttons combining with longer sequences
-                    # max_use=None allows multi-button combinations
-                    if pattern.sequence[j].max_use is not None and history[j].used > pattern.sequence[j].max_use:
-                        matches = False
-                        break
-
-                # Only complete matches trigger commands (last iteration)
-                if matches and i == history_len - 1:
-                    matching_patterns.append(pattern)
+        Same rules as find_matching_patterns(), but stops at the first hit
+        without building a list; only the first match is ever executed.
 
-        return matching_patterns
+        Returns:
+            First matching pattern in configuration order, or None
+        """
+        if not self.config or not self.history.entries:
+            return None
+
+        history = self.history.entries
+        patterns = self.config.get_patterns_by_keys(self.history.event_keys)
+        if not patterns:
+            return None
+
+        time_diff = self.history.time_span()
+        for pattern in patterns:
+            if time_diff > pattern.time_constraint:
+                continue
+            usage_match = pattern.usage_match
+            if usage_match is None or usage_match(history):
+                return pattern
+
+        return None
 
     def find_repeat_patterns(self) -> List[ButtonEventPattern]:
         """
@@ -184,40 +367,33 @@ class DeviceHandler:
         This differs from find_matching_patterns() which respects max_use limits
         to prevent single-button patterns from combining with longer sequences.
 
+        Called on every event loop cycle while buttons are held, so the
+        result is cached until the history or config changes.
+
         Returns:
             List of repeat-enabled patterns matching current history state
         """
         if not self.config or not self.history.entries:
             return []
 
-        matching = []
-        history = self.history.entries
-        history_len = len(history)
-
-        for pattern in self.config.patterns:
-            if not pattern.repeat:
-                continue
-
-            if len(pattern.sequence) != history_len:
-                continue
-
-            if history_len > 1:
-                time_diff = (history[-1].timestamp - history[0].timestamp).total_seconds()
-                if time_diff > pattern.time_constraint:
-                    continue
+        key = (self.history.version, self.config.version)
+        if key == self.repeat_cache_key:
+            return self.repeat_cache
 
-            matches = True
-            for j in range(history_len):
-                if not pattern.sequence[j].matches(history[j]):
-                    matches = False
-                    break
+        matching = []
+        time_diff = self.history.time_span()
 
-            if matches:
+        # History keeps its (button, event) projection up to date, so the
+        # candidates are a single lookup
+        for pattern in self.config.get_patterns_by_keys(self.history.event_keys):
+            if pattern.repeat and time_diff <= pattern.time_constraint:
                 matching.append(pattern)
 
+        self.repeat_cache_key = key
+        self.repeat_cache = matching
         return matching
 
-    def check_and_fire_repeats(self, repeat_rate: float) -> None:
+    def check_and_fire_repeats(self, repeat_rate: Optional[float] = None) -> None:
         """
         Check timer and fire repeat patterns if interval elapsed
 
@@ -225,42 +401,28 @@ class DeviceHandler:
         Timer is independent of select() behavior, ensuring consistent
         intervals without jitter from spurious events.
 
-        First repeat fires after 2x interval to prevent rapid double-fire.
-        Subsequent repeats fire at normal interval.
+        process_event() arms repeat_deadline at 2x interval when a repeat
+        pattern first fires, preventing rapid double-fire. Each fire here
+        moves the deadline one normal interval ahead.
 
         Args:
-            repeat_rate: Seconds between repeat fires
+            repeat_rate: Seconds between repeat fires (default: self.repeat_rate)
 
         Fires when:
         - Repeat patterns match current history AND
-        - Timer interval has elapsed (2x for first repeat, 1x for subsequent)
+        - repeat_deadline has passed
         """
         repeat_patterns = self.find_repeat_patterns()
 
         if not repeat_patterns:
-            self.last_repeat_time = None
+            self.repeat_deadline = math.inf
             return
 
         now = time.monotonic()
-        should_fire = False
-        required_interval = repeat_rate
-
-        if self.last_repeat_time is None:
-            should_fire = False
-        elif self.last_repeat_time < 0:
-            required_interval = repeat_rate * 2
-            elapsed = now - abs(self.last_repeat_time)
-            if elapsed >= required_interval:
-                should_fire = True
-        elif (now - self.last_repeat_time) >= repeat_rate:
-            should_fire = True
-        else:
-            should_fire = False
-
-        if not should_fire:
+        if now < self.repeat_deadline:
             return
 
-        self.last_repeat_time = now
+        self.repeat_deadline = now + (self.repeat_rate if repeat_rate is None else repeat_rate)
 
         instance_label = None
         if self.config and self.config.config_file:
@@ -274,60 +436,135 @@ class DeviceHandler:
                 click.secho(header, bold=True)
                 click.secho(f"   - {pattern.sequence_str()}: {click.style(pattern.command, fg='yellow', bold=True)}", fg="cyan")
 
-            try:
-                subprocess.run(pattern.command, shell=True, check=True)
-            except subprocess.CalledProcessError as e:
-                if not self.quiet:
-                    click.secho(f"  Warning: Repeat command failed (exit code {e.returncode})", fg="yellow", err=True)
+            self.run_command(pattern)
 
     def process_event(self, event) -> None:
         """
         Process a single event from the pedal device
 
+        Thin shim over dispatch() for evdev.InputEvent objects. Event types
+        no mapping uses (EV_SYN, EV_MSC, ...) are dropped before the call,
+        as read_pending does for raw records.
+
         Args:
             event: evdev.InputEvent object
         """
-        if event is None:
+        if event is None or event.type not in self.event_types:
             return
 
-        # Look up button using (type, code, value) tuple
-        key = (event.type, event.code, event.value)
-        mapping = self.key_codes.get(key)
+        self.dispatch(event.type, event.code, event.value, event.timestamp())
+
+    def dispatch(self, event_type: int, code: int, value: int, timestamp: Optional[float] = None) -> None:
+        """
+        Process a single decoded input event
+
+        Hot path shared by every event source. Works on plain integers so
+        callers that decode raw input_event records do not need to build
+        evdev.InputEvent objects first.
+
+        Args:
+            event_type: Event type (EV_KEY, EV_REL, ...)
+            code: Event code
+            value: Event value
+            timestamp: Kernel event time in seconds, used for debouncing;
+                       defaults to the monotonic clock
+        """
+        # Key press/release goes through the dense table, anything else
+        # through the (type, code, value) dict
+        if event_type == EV_KEY and 0 <= value <= 1:
+            index = ((code - self.key_base) << 1) | value
+            mapping = self.key_table[index] if 0 <= index < len(self.key_table) else None
+        else:
+            mapping = self.key_codes.get((event_type, code, value))
         if mapping is None:
             return
 
         button, auto_release = mapping
 
+        # Mechanical contacts bounce; hold back press/release changes that
+        # follow the last accepted one within the debounce interval. The
+        # latest one is applied when the interval ends (flush_debounced), so
+        # a quick tap still releases.
+        if self.debounce and not auto_release and 0 <= value <= 1:
+            if timestamp is None:
+                timestamp = time.monotonic()
+            last = self.last_change.get(button)
+            if last is not None and timestamp - last < self.debounce:
+                window_end = last + self.debounce
+                due = time.monotonic() + (window_end - timestamp)
+                self.debounce_pending[button] = (value, window_end, due)
+                self.debounce_deadline = min(self.debounce_deadline, due)
+                return
+            pending = self.debounce_pending.pop(button, None)
+            if pending is not None:
+                self.update_debounce_deadline()
+                # The held back change was never flushed (e.g. it came in the
+                # same read as this one); apply it first so it is not lost
+                if self.pedal_state.get_state().get(button) is not BUTTON_EVENTS[pending[0]]:
+                    self.handle_button(button, False, pending[0])
+            self.last_change[button] = timestamp
+
+        self.handle_button(button, auto_release, value)
+
+    def update_debounce_deadline(self) -> None:
+        """Recompute debounce_deadline from the held back changes"""
+        self.debounce_deadline = min((due for _, _, due in self.debounce_pending.values()),
+                                     default=math.inf)
+
+    def flush_debounced(self) -> None:
+        """
+        Apply held back changes whose debounce interval has ended
+
+        A change is only applied if it differs from the current button
+        state; a bounce that settled back where it started is dropped.
+        """
+        now = time.monotonic()
+        for button, (value, window_end, due) in list(self.debounce_pending.items()):
+            if due > now:
+                continue
+            del self.debounce_pending[button]
+            if self.pedal_state.get_state().get(button) is not BUTTON_EVENTS[value]:
+                self.last_change[button] = window_end
+                self.handle_button(button, False, value)
+        self.update_debounce_deadline()
+
+    def handle_button(self, button: Button, auto_release: bool, value: int) -> None:
+        """
+        Record a button change and run the first matching pattern
+
+        Args:
+            button: Button that changed
+            auto_release: Record a press immediately followed by a release
+            value: Event value, 1 for press and 0 for release
+        """
+        pedal_state = self.pedal_state
+        history = self.history
+
         if auto_release:
-            self.pedal_state.update(button, ButtonEvent.BUTTON_DOWN)
-            self.history.add_entry(button, ButtonEvent.BUTTON_DOWN, self.pedal_state.get_state())
-            self.pedal_state.update(button, ButtonEvent.BUTTON_UP)
-            self.history.add_entry(button, ButtonEvent.BUTTON_UP, self.pedal_state.get_state())
-        elif event.value == 1:
-            button_event = ButtonEvent.BUTTON_DOWN
-            self.pedal_state.update(button, button_event)
-            self.history.add_entry(button, button_event, self.pedal_state.get_state())
-        elif event.value == 0:
-            button_event = ButtonEvent.BUTTON_UP
-            self.pedal_state.update(button, button_event)
-            self.history.add_entry(button, button_event, self.pedal_state.get_state())
+            pedal_state.update(button, BUTTON_DOWN)
+            history.add_entry(button, BUTTON_DOWN, pedal_state.get_state())
+            pedal_state.update(button, BUTTON_UP)
+            history.add_entry(button, BUTTON_UP, pedal_state.get_state())
+        elif 0 <= value <= 1:
+            button_event = BUTTON_EVENTS[value]
+            pedal_state.update(button, button_event)
+            history.add_entry(button, button_event, pedal_state.get_state())
         else:
-            click.secho(f"  Warning: Unexpected event value {event.value} for button {button}", fg="yellow", err=True)
+            click.secho(f"  Warning: Unexpected event value {value} for button {button}", fg="yellow", err=True)
             return
 
-        # Derive instance label from config
+        # Derive instance label from config, only needed for output
         instance_label = None
-        if self.config and self.config.config_file:
-            instance_label = os.path.basename(self.config.config_file)
-
-        # Display current history
         if not self.quiet:
-            self.history.display_all(instance_label)
+            if self.config and self.config.config_file:
+                instance_label = os.path.basename(self.config.config_file)
+
+            # Display current history
+            history.display_all(instance_label)
 
-        # Find and execute matching patterns
-        matching_patterns = self.find_matching_patterns()
-        if matching_patterns:
-            pattern = matching_patterns[0]
+        # Find and execute the first matching pattern
+        pattern = self.find_first_matching_pattern()
+        if pattern is not None:
             if not self.quiet:
                 header = "  Patterns run:"
                 if instance_label:
@@ -336,33 +573,112 @@ class DeviceHandler:
                 click.secho(f"   - {pattern.sequence_str()}: {click.style(pattern.command, fg='yellow', bold=True)}", fg="cyan")
 
             # Execute the command
-            subprocess.run(pattern.command, shell=True, check=True)
+            self.run_command(pattern)
 
             # Mark history entries as used to prevent reuse, unless pattern repeats
             # Repeat patterns skip incrementing used counter to allow continuous matching
             if not pattern.repeat:
-                self.history.set_used()
+                history.set_used()
             else:
-                self.last_repeat_time = -time.monotonic()
+                # First repeat waits 2x interval to prevent rapid double-fire
+                self.repeat_deadline = time.monotonic() + 2 * self.repeat_rate
 
         # Clean up history after command execution
-        self.history.pop_released(self.pedal_state.get_state())
+        history.pop_released(pedal_state.get_state())
 
-        # Reset repeat timer when history is cleared
-        if not self.history.entries:
-            self.last_repeat_time = None
+        # Disarm repeat timer when history is cleared
+        if not history.entries:
+            self.repeat_deadline = math.inf
 
-    def read_events(self) -> None:
-        """Read and process events from the pedal device"""
+    def read_pending(self) -> int:
+        """
+        Read and dispatch pending raw input_events from the open device
+
+        Reads up to READ_BATCH events with one syscall straight from the
+        device fd into a preallocated buffer and decodes them in place, so
+        the steady state allocates no bytes or evdev.InputEvent objects.
+        The kernel only ever returns whole input_event records.
+
+        Returns:
+            Number of events read, 0 if none were pending
+
+        Raises:
+            OSError: If the device was disconnected
+        """
+        try:
+            n = os.readv(self.device.fd, [self._buf])
+        except BlockingIOError:
+            return 0
+
+        mv = self._mv
+        types = self._types
+        event_types = self.event_types
+        dispatch = self.dispatch
+        for offset in range(0, n - n % EVENT_SIZE, EVENT_SIZE):
+            # Peek at the type in place so EV_SYN and friends cost no decoding
+            if types[(offset + TYPE_OFFSET) >> 1] not in event_types:
+                continue
+
+            sec, usec, event_type, code, value = unpack_event(mv, offset)
+            dispatch(event_type, code, value, sec + usec * 1e-6)
+
+        return n // EVENT_SIZE
+
+    def handle_ready(self) -> bool:
+        """
+        Service the device after select() reported it readable
+
+        Single read path shared by every event loop: drains and dispatches
+        all queued input events and handles disconnects. A short read means
+        the kernel queue is empty, so draining costs no extra EAGAIN read.
+
+        Returns:
+            True if the device is still connected, False if it was closed
+        """
+        read_pending = self.read_pending
         try:
-            with InputDevice(self.device_path) as device:
-                if not self.shared:
-                    device.grab()
+            while read_pending() == READ_BATCH:
+                pass
+        except (OSError, IOError):
+            click.secho(f"Device {self.device_path} disconnected", fg="red", err=True)
+            self.close()
+            return False
+
+        return True
+
+    def read_events(self) -> None:
+        """
+        Read and process events from the pedal device
+
+        Blocks in the selector until input arrives instead of polling; it
+        only wakes periodically while commands remain to be reaped. Signals
+        still interrupt the wait, so Ctrl+C and SIGTERM behave as before
+        without a self-pipe.
 
-                while True:
-                    event = device.read_one()
-                    if event is not None:
-                        self.process_event(event)
+        A disconnected device ends the loop without raising: the disconnect
+        is reported on stderr and read_events() returns normally, which it
+        does in no other case.
+
+        Raises:
+            FileNotFoundError: If the device does not exist
+            PermissionError: If the device cannot be opened
+        """
+        selector = selectors.DefaultSelector()
+        try:
+            self.open()
+            selector.register(self.device.fd, selectors.EVENT_READ)
+
+            while True:
+                timeout = 1.0 if self.children or self.pending else None
+                if self.debounce_deadline != math.inf:
+                    remaining = max(0.0, self.debounce_deadline - time.monotonic())
+                    timeout = remaining if timeout is None else min(timeout, remaining)
+                selector.select(timeout)
+                if not self.handle_ready():
+                    break
+                if self.debounce_deadline <= time.monotonic():
+                    self.flush_debounced()
+                self.reap_children()
 
         except FileNotFoundError:
             raise
@@ -371,3 +687,6 @@ class DeviceHandler:
         except Exception as e:
             click.secho(f"  Error: {str(e)}", fg="red", err=True)
             raise
+        finally:
+            selector.close()
+            self.close()
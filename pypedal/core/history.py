@@ -1,19 +1,32 @@
 """
 History tracking functionality for pedal events
 """
-from dataclasses import dataclass
-from typing import Dict, List
+import itertools
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List, Mapping, Optional, Set, Tuple
 from datetime import datetime
 import click
-from .pedal import Button, ButtonEvent
+from .pedal import Button, ButtonEvent, ButtonStates
 
-@dataclass
+# Source of History.version values, unique across all History objects
+VERSIONS = itertools.count(1)
+
+# Wall clock minus monotonic clock, fixed at import, for placing explicit
+# datetime timestamps on the monotonic time line
+WALL_TO_MONO = time.time() - time.monotonic()
+
+# Slotted dataclasses need Python 3.10; older versions fall back to __dict__
+DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(**DATACLASS_SLOTS)
 class HistoryEntry:
     """
     Represents a single event in history
     
     Tracks:
-    - When the event occurred (timestamp)
+    - When the event occurred (timestamp for display, mono for timing)
     - Which button was involved (button)
     - Type of event (press/release)
     - State of all buttons at time of event
@@ -22,8 +35,17 @@ class HistoryEntry:
     timestamp: datetime
     button: Button
     event: ButtonEvent
-    button_states: Dict[Button, ButtonEvent]
+    button_states: Mapping[Button, ButtonEvent]
     used: int = 0
+    # Monotonic seconds used for time constraints; derived from timestamp
+    # through WALL_TO_MONO if not given, so all entries share one clock
+    mono: float = field(default=None, repr=False, compare=False)
+    # Formatted text of everything but the used counter, built on first display
+    display_prefix: str = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.mono is None:
+            self.mono = self.timestamp.timestamp() - WALL_TO_MONO
 
     def __str__(self) -> str:
         """
@@ -32,20 +54,29 @@ class HistoryEntry:
         Where:
         - + means pressed, - means released
         - Shows all available buttons
+
+        Only the used counter changes after the entry is created, so the
+        rest is formatted once and reused by every later display_all().
         """
-        state_parts = []
-        # Show all buttons in button_states
-        for button in sorted(self.button_states.keys()):
-            state = self.button_states.get(button, ButtonEvent.BUTTON_UP)
-            state_symbol = '+' if state == ButtonEvent.BUTTON_DOWN else '-'
-            state_parts.append(f"B{button}:{state_symbol}")
-        states = " ".join(state_parts)
-
-        event_str = "pressed " if self.event == ButtonEvent.BUTTON_DOWN else "released"
-        event_color = "green" if self.event == ButtonEvent.BUTTON_DOWN else "red"
-        button_str = f"B{self.button}"
-        used_str = f"(used:{str(self.used)})"
-        return f"{self.timestamp.strftime('%H:%M:%S.%f')[:-3]} {button_str} {click.style(event_str, fg=event_color):8} | {states} {used_str}"
+        if self.display_prefix is None:
+            if isinstance(self.button_states, ButtonStates):
+                # Snapshots are already in button order and cache their text
+                states = str(self.button_states)
+            else:
+                state_parts = []
+                # Show all buttons in button_states
+                for button in sorted(self.button_states.keys()):
+                    state = self.button_states.get(button, ButtonEvent.BUTTON_UP)
+                    state_symbol = '+' if state == ButtonEvent.BUTTON_DOWN else '-'
+                    state_parts.append(f"B{button}:{state_symbol}")
+                states = " ".join(state_parts)
+
+            event_str = "pressed " if self.event == ButtonEvent.BUTTON_DOWN else "released"
+            event_color = "green" if self.event == ButtonEvent.BUTTON_DOWN else "red"
+            button_str = f"B{self.button}"
+            self.display_prefix = f"{self.timestamp.strftime('%H:%M:%S.%f')[:-3]} {button_str} {click.style(event_str, fg=event_color):8} | {states}"
+
+        return f"{self.display_prefix} (used:{self.used})"
 
 class History:
     """
@@ -56,31 +87,82 @@ class History:
     2. Maintain current state of all buttons
     3. Track usage of events in pattern matching
     4. Clean up history when buttons released
+
+    event_keys mirrors entries as a tuple of (button, event) pairs, kept in
+    step by add_entry() and pop_released() so matching can compare whole
+    sequences without re-reading every entry.
+
+    version changes on every mutating method so callers can cache
+    results derived from the history until it changes. Versions are drawn
+    from one global counter, so they never repeat even across the fresh
+    History objects created when a configuration is reloaded.
+
+    on_nonempty and on_empty, when set, are called as the history goes
+    from empty to holding an entry and back.
     """
     def __init__(self):
         self.entries: List[HistoryEntry] = []
+        self.event_keys: Tuple[Tuple[Button, ButtonEvent], ...] = ()
         self.all_buttons: List[Button] = []
+        self.all_buttons_set: Set[Button] = set()
+        # Bitmask of all_buttons for ButtonStates snapshots
+        self.all_buttons_mask = 0
+        self.version = next(VERSIONS)
+        self.on_nonempty: Optional[Callable[[], None]] = None
+        self.on_empty: Optional[Callable[[], None]] = None
 
-    def add_entry(self, button: Button, event: ButtonEvent, button_states: Dict[Button, ButtonEvent], timestamp: datetime = None) -> HistoryEntry:
+    def add_entry(self, button: Button, event: ButtonEvent, button_states: Mapping[Button, ButtonEvent], timestamp: datetime = None) -> HistoryEntry:
         """
         Add a new entry to history
         Records button event with current state of all buttons
+
+        Without an explicit timestamp the entry is timed with the monotonic
+        clock, so constraints are immune to wall-clock jumps. An explicit
+        timestamp is mapped onto the monotonic clock with a fixed offset,
+        so entries with and without timestamps can share a history.
         """
-        # Track all available buttons
-        for b in button_states:
-            if b not in self.all_buttons:
-                self.all_buttons.append(b)
+        # Track all available buttons; a snapshot with no unseen buttons,
+        # the usual case, costs a single mask test
+        if not isinstance(button_states, ButtonStates) or button_states.known & ~self.all_buttons_mask:
+            for b in button_states:
+                if b not in self.all_buttons_set:
+                    self.all_buttons_set.add(b)
+                    self.all_buttons.append(b)
+            if isinstance(button_states, ButtonStates):
+                self.all_buttons_mask |= button_states.known
+
+        mono = None
+        if timestamp is None:
+            mono = time.monotonic()
+            timestamp = datetime.now()
 
         entry = HistoryEntry(
-            timestamp=timestamp or datetime.now(),
+            timestamp=timestamp,
             button=button,
             event=event,
-            button_states=button_states.copy()
+            button_states=button_states.copy(),
+            mono=mono
         )
         self.entries.append(entry)
+        self.event_keys += ((button, event),)
+        self.version = next(VERSIONS)
+        if len(self.entries) == 1 and self.on_nonempty is not None:
+            self.on_nonempty()
         return entry
 
-    def pop_released(self, current_states: Dict[Button, ButtonEvent]) -> None:
+    def time_span(self) -> float:
+        """
+        Seconds between the first and the last entry
+
+        Only the full history can complete a pattern, so this span is all a
+        time constraint needs. A single entry spans no time.
+        """
+        entries = self.entries
+        if len(entries) < 2:
+            return 0.0
+        return entries[-1].mono - entries[0].mono
+
+    def pop_released(self, current_states: Mapping[Button, ButtonEvent]) -> None:
         """
         Remove all released buttons until a pressed button is found, like a stack.
         
@@ -89,18 +171,18 @@ class History:
         2. Single button patterns clear after release
         3. Multi-button patterns maintain while buttons held
         """
-        # Start from most recent entry
-        for i in reversed(range(len(self.entries))):
-            entry = self.entries[i]
-
-            # Check if this button is pressed in current state
-            if current_states.get(entry.button) == ButtonEvent.BUTTON_DOWN:
-                # Keep this entry and all before it
-                self.entries = self.entries[:i+1]
-                break
-        else:
-            # No pressed buttons found, clear all entries
-            self.entries.clear()
+        # Pop from the most recent entry until one whose button is still held
+        entries = self.entries
+        count = len(entries)
+        while entries and current_states.get(entries[-1].button) is not ButtonEvent.BUTTON_DOWN:
+            entries.pop()
+
+        # Unchanged history keeps its version so cached matches stay valid
+        if len(entries) != count:
+            self.event_keys = self.event_keys[:len(entries)]
+            self.version = next(VERSIONS)
+            if not entries and self.on_empty is not None:
+                self.on_empty()
 
     def set_used(self) -> None:
         """
@@ -113,18 +195,24 @@ class History:
         """
         for i in range(len(self.entries)):
             self.entries[i].used += 1
+        self.version = next(VERSIONS)
 
     def display_all(self, instance_label: str = None) -> None:
         """
         Display all history entries
 
+        The whole block is written with a single echo so a burst of events
+        does not cost one terminal write per history line.
+
         Args:
             instance_label: Optional label identifying the configuration source
         """
-        if self.entries:
-            header = "\nHistory:"
-            if instance_label:
-                header = f"\nHistory [{instance_label}]:"
-            click.secho(header, bold=True)
-            for entry in self.entries:
-                click.echo("   - " + str(entry))
+        if not self.entries:
+            return
+
+        header = "\nHistory:"
+        if instance_label:
+            header = f"\nHistory [{instance_label}]:"
+        lines = [click.style(header, bold=True)]
+        lines.extend("   - " + str(entry) for entry in self.entries)
+        click.echo("\n".join(lines))
@@ -1,18 +1,24 @@
 """
 Instance management for multiple configuration files
 """
+import math
 import os
+import selectors
 import time
 import click
 from dataclasses import dataclass
-from typing import Dict, List, TYPE_CHECKING
-from select import select
+from typing import Dict, List, Optional, Set, Tuple, TYPE_CHECKING
 from .config import Config
+from .history import History
 from .multi_device import MultiDeviceHandler
+from .watch import ConfigWatcher
 
 if TYPE_CHECKING:
     from .device import DeviceHandler
 
+# Seconds between probes for disconnected devices
+RECONNECT_INTERVAL = 1.0
+
 @dataclass
 class Instance:
     """
@@ -23,6 +29,8 @@ class Instance:
     - handler: Multi-device event handler
     - devices: Dictionary mapping file descriptors to handlers for select()
     """
+    __slots__ = ('config', 'handler', 'devices')
+
     config: Config
     handler: MultiDeviceHandler
     devices: Dict[int, 'DeviceHandler']
@@ -40,9 +48,28 @@ class InstanceManager:
             repeat_rate: Repeat rate in seconds for patterns marked with repeat
         """
         self.instances: List[Instance] = []
+        # Device handlers of all instances, rebuilt when an instance is added or reloaded
+        self.handlers: Tuple['DeviceHandler', ...] = ()
         self.quiet = quiet
         self.debug = debug
         self.repeat_rate = repeat_rate
+        # Last select timeout and the (history, config) versions it was computed for
+        self.select_timeout = 1.0
+        self.select_timeout_key = None
+        # Number of instance histories holding entries, kept by track_history()
+        self.nonempty_histories = 0
+        # Open devices of all instances stay registered between cycles;
+        # each key's data is the (instance, handler) owning the fd
+        self.selector = selectors.DefaultSelector()
+        # Monotonic time at which disconnected devices are next probed
+        self.next_reconnect_check = 0.0
+        # Configuration writes arrive as inotify events on the same selector
+        # (key data None); without inotify the files are polled every cycle
+        try:
+            self.config_watcher: Optional[ConfigWatcher] = ConfigWatcher()
+            self.selector.register(self.config_watcher, selectors.EVENT_READ, None)
+        except OSError:
+            self.config_watcher = None
 
     def add_config_file(self, config_file: str) -> Instance:
         """
@@ -59,7 +86,7 @@ class InstanceManager:
         if not config.devices:
             raise click.UsageError(f"No devices configured in {config_file}. Add device configs like: dev: /path/to/device [1,2,3]")
 
-        handler = MultiDeviceHandler(config)
+        handler = MultiDeviceHandler(config, repeat_rate=self.repeat_rate, quiet=self.quiet)
 
         instance = Instance(
             config=config,
@@ -68,6 +95,14 @@ class InstanceManager:
         )
 
         self.instances.append(instance)
+        self.refresh_handlers()
+        self.track_history(handler.history)
+
+        if self.config_watcher is not None:
+            try:
+                self.config_watcher.add(config_file)
+            except OSError as e:
+                click.secho(f"Warning: not watching {config_file} for changes: {e}", fg="yellow", err=True)
 
         if self.debug:
             click.echo(f"\nConfiguration file: {config_file}")
@@ -81,31 +116,81 @@ class InstanceManager:
         Check for reconnection of previously disconnected devices
 
         Polls device paths that were disconnected and attempts to reopen
-        them if the path exists again
+        them if the path exists again.  process_one_cycle calls this at most
+        every RECONNECT_INTERVAL seconds.
         """
         for instance in self.instances:
             for handler in instance.handler.handlers:
                 if handler.attempt_reconnection():
                     if handler.fd is not None:
-                        instance.devices[handler.fd] = handler
+                        self.add_device(instance, handler)
                         click.secho(f"Device {handler.device_path} reconnected", fg="green", err=True)
 
-    def reload_if_changed(self) -> None:
+    def reload_if_changed(self, changed: Optional[Set[str]] = None) -> None:
         """
-        Check all configuration files for modifications and reload if changed
+        Check configuration files for modifications and reload if changed
 
         Reloads entire instance if its configuration file has been modified
+
+        Args:
+            changed: Resolved paths reported by the config watcher; only these
+                     files are checked.  None checks every configuration file.
         """
-        for i, instance in enumerate(self.instances):
+        for instance in self.instances:
+            if changed is not None and os.path.realpath(instance.config.config_file) not in changed:
+                continue
             if instance.config.reload_if_changed():
                 click.secho(f"Configuration reloaded from {instance.config.config_file}", fg="green", err=True)
 
                 self.close_instance_devices(instance)
+                instance.handler.shutdown()
+                self.untrack_history(instance.handler.history)
 
-                instance.handler = MultiDeviceHandler(instance.config)
+                instance.handler = MultiDeviceHandler(instance.config, repeat_rate=self.repeat_rate,
+                                                      quiet=self.quiet)
+                self.track_history(instance.handler.history)
                 instance.devices = {}
 
                 self.open_instance_devices(instance)
+                self.refresh_handlers()
+
+    def refresh_handlers(self) -> None:
+        """Rebuild the flat tuple of device handlers across all instances"""
+        self.handlers = tuple(handler
+                              for instance in self.instances
+                              for handler in instance.handler.handlers)
+
+    def track_history(self, history: History) -> None:
+        """
+        Count history in nonempty_histories while it holds entries
+
+        Args:
+            history: History of an instance's multi-device handler
+        """
+        history.on_nonempty = self.history_filled
+        history.on_empty = self.history_emptied
+        if history.entries:
+            self.nonempty_histories += 1
+
+    def untrack_history(self, history: History) -> None:
+        """
+        Stop counting a history that is being replaced
+
+        Args:
+            history: History previously passed to track_history()
+        """
+        history.on_nonempty = None
+        history.on_empty = None
+        if history.entries:
+            self.nonempty_histories -= 1
+
+    def history_filled(self) -> None:
+        """Called when a tracked history gets its first entry"""
+        self.nonempty_histories += 1
+
+    def history_emptied(self) -> None:
+        """Called when a tracked history loses its last entry"""
+        self.nonempty_histories -= 1
 
     def open_instance_devices(self, instance: Instance) -> None:
         """
@@ -118,7 +203,7 @@ class InstanceManager:
             try:
                 handler.open()
                 if handler.fd is not None:
-                    instance.devices[handler.fd] = handler
+                    self.add_device(instance, handler)
             except (FileNotFoundError, OSError, IOError, PermissionError):
                 # Device does not exist yet, reconnection polling will activate when available
                 pass
@@ -135,15 +220,51 @@ class InstanceManager:
         Args:
             instance: Instance whose devices to close
         """
+        for fd in list(instance.devices):
+            self.remove_device(instance, fd)
         for handler in instance.handler.handlers:
             handler.close()
-        instance.devices.clear()
+
+    def add_device(self, instance: Instance, handler: 'DeviceHandler') -> None:
+        """
+        Track an opened device and register it with the selector
+
+        Args:
+            instance: Instance owning the device
+            handler: Handler whose device was opened
+        """
+        instance.devices[handler.fd] = handler
+        self.selector.register(handler.fd, selectors.EVENT_READ, (instance, handler))
+
+    def remove_device(self, instance: Instance, fd: int) -> None:
+        """
+        Stop tracking a device and unregister it from the selector
+
+        Safe to call after the device was closed.
+
+        Args:
+            instance: Instance owning the device
+            fd: File descriptor the device was registered with
+        """
+        del instance.devices[fd]
+        self.selector.unregister(fd)
 
     def close_all_devices(self) -> None:
         """Close all devices for all instances"""
         for instance in self.instances:
             self.close_instance_devices(instance)
 
+    def close(self) -> None:
+        """Close all devices, command workers, the configuration watcher and the selector"""
+        self.close_all_devices()
+        for instance in self.instances:
+            instance.handler.shutdown()
+        if self.config_watcher is not None:
+            self.selector.unregister(self.config_watcher)
+            self.config_watcher.close()
+            self.config_watcher = None
+        self.selector.close()
+
     def calculate_select_timeout(self) -> float:
         """
         Calculate dynamic select timeout based on history state
@@ -153,42 +274,41 @@ class InstanceManager:
         - repeat_rate when any repeat pattern matches current history
         - 0.1 seconds otherwise (default polling rate)
 
+        The idle case is read from nonempty_histories alone. Otherwise the
+        result only changes with the histories or configurations, so it is
+        cached until one of their versions changes.
+
         Returns:
             Timeout value in seconds for select() call
         """
-        all_empty = True
-        for instance in self.instances:
-            if instance.handler.history.entries:
-                all_empty = False
+        if self.nonempty_histories == 0:
+            return 1.0
+
+        key = tuple((instance.handler.history.version, instance.config.version)
+                    for instance in self.instances)
+        if key == self.select_timeout_key:
+            return self.select_timeout
+
+        has_repeat = False
+        for handler in self.handlers:
+            if handler.find_repeat_patterns():
+                has_repeat = True
                 break
 
-        timeout = 0.1
-
-        if all_empty:
-            timeout = 1.0
+        if has_repeat:
+            timeout = self.repeat_rate
         else:
-            has_repeat = False
-            for instance in self.instances:
-                for handler in instance.handler.handlers:
-                    repeat_patterns = handler.find_repeat_patterns()
-                    if repeat_patterns:
-                        has_repeat = True
-                        break
-                if has_repeat:
-                    break
-
-            if has_repeat:
-                timeout = self.repeat_rate
-            else:
-                timeout = 0.1
+            timeout = 0.1
 
+        self.select_timeout = timeout
+        self.select_timeout_key = key
         return timeout
 
     def process_one_cycle(self) -> bool:
         """
         Process one select cycle across all instances
 
-        Polls all device file descriptors and processes ready events
+        Waits on the selector for ready devices and processes their events
 
         Returns:
             True if processing should continue, False if all devices closed
@@ -196,41 +316,59 @@ class InstanceManager:
         continue_processing = False
 
         try:
-            self.attempt_reconnection()
-            self.reload_if_changed()
-
-            all_devices = {}
-            for instance in self.instances:
-                all_devices.update(instance.devices)
-
-            if all_devices:
-                fds = list(all_devices.keys())
+            now = time.monotonic()
+            if now >= self.next_reconnect_check:
+                self.attempt_reconnection()
+                self.next_reconnect_check = now + RECONNECT_INTERVAL
+            if self.config_watcher is None:
+                self.reload_if_changed()
+
+            if any(instance.devices for instance in self.instances):
                 timeout = self.calculate_select_timeout()
-                ready, _, _ = select(fds, [], [], timeout)
-
-                if ready:
-                    for fd in ready:
-                        handler = all_devices[fd]
-
-                        try:
-                            event = handler.device.read_one()
-                            if event is not None:
-                                handler.process_event(event)
-                        except (OSError, IOError):
-                            click.secho(f"Device {handler.device_path} disconnected", fg="red", err=True)
-                            handler.close()
-
-                            for instance in self.instances:
-                                if fd in instance.devices:
-                                    del instance.devices[fd]
-                                    break
-
-                # Check and fire repeats every cycle (timer-based, not timeout-based)
-                for instance in self.instances:
-                    for handler in instance.handler.handlers:
-                        handler.check_and_fire_repeats(self.repeat_rate)
+
+                # Wake no later than the earliest armed repeat or held back
+                # debounced change is due
+                next_deadline = min((min(handler.repeat_deadline, handler.debounce_deadline)
+                                     for handler in self.handlers), default=math.inf)
+                if next_deadline != math.inf:
+                    timeout = min(timeout, max(0.0, next_deadline - time.monotonic()))
+
+                config_changed = False
+                for key, _ in self.selector.select(timeout):
+                    if key.data is None:
+                        config_changed = True
+                        continue
+
+                    instance, handler = key.data
+
+                    if not handler.handle_ready():
+                        self.remove_device(instance, key.fd)
+
+                # Reload only after every ready device was served: a reload
+                # closes handlers whose keys may still be in this select result
+                if config_changed:
+                    self.reload_if_changed(self.config_watcher.read_changed())
+
+                # Fire repeats whose deadline has passed; handlers without an
+                # armed repeat (deadline inf) have nothing to fire.  Read
+                # self.handlers again, a reload above may have replaced them.
+                now = time.monotonic()
+                repeat_rate = self.repeat_rate
+                for handler in self.handlers:
+                    if handler.debounce_deadline <= now:
+                        handler.flush_debounced()
+                    if handler.repeat_deadline <= now:
+                        handler.check_and_fire_repeats(repeat_rate)
+                    handler.reap_children()
             else:
-                time.sleep(0.1)
+                # No open devices: nothing is due before the next reconnection
+                # probe except configuration writes
+                timeout = max(0.0, self.next_reconnect_check - time.monotonic())
+                if self.config_watcher is not None:
+                    if self.selector.select(timeout):
+                        self.reload_if_changed(self.config_watcher.read_changed())
+                else:
+                    time.sleep(timeout)
 
             continue_processing = True
 
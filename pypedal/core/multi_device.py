@@ -1,10 +1,13 @@
 """
 Multi-device pedal event handling functionality
 """
+import math
+import selectors
+import time
 import click
-from typing import List, Tuple, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple, Dict
 from evdev import InputDevice
-from select import select
 from .device import DeviceHandler
 from .config import Config
 from .pedal import Button, PedalState
@@ -12,38 +15,43 @@ from .history import History
 
 class MultiDeviceHandler:
     """Manages multiple pedal devices with offset button numbering"""
+    __slots__ = ('handlers', 'device_map', 'config', 'history', 'pedal_state', 'executor', 'selector')
 
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, repeat_rate: float = 0.1, quiet: bool = False):
         """
         Initialize handlers for multiple devices
 
         Args:
             config: Configuration for button patterns and devices
+            repeat_rate: Repeat rate in seconds for patterns marked with repeat
+            quiet: Suppress history and pattern output
         """
         self.handlers: List[DeviceHandler] = []
         self.device_map: Dict[str, DeviceHandler] = {}
         self.config = config
         self.history = History()
 
-        all_buttons = []
-        seen_buttons = set()
-        for device_config in config.devices:
-            for button in device_config.get_buttons():
-                if button not in seen_buttons:
-                    all_buttons.append(button)
-                    seen_buttons.add(button)
+        # PedalState needs every button up front; it removes duplicates itself
+        device_buttons = [device_config.get_buttons() for device_config in config.devices]
+        self.pedal_state = PedalState([button for buttons in device_buttons for button in buttons])
+        # One worker for all devices keeps commands in the order they matched
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        # Created when devices are opened; each key's data is the handler owning the fd
+        self.selector: Optional[selectors.BaseSelector] = None
 
-        self.pedal_state = PedalState(all_buttons)
-
-        for device_config in config.devices:
+        for device_config, buttons in zip(config.devices, device_buttons):
             handler = DeviceHandler(
                 device_config.path,
                 key_codes=device_config.get_key_code_map(),
-                buttons=device_config.get_buttons(),
+                buttons=buttons,
                 config=config,
+                quiet=quiet,
                 history=self.history,
                 pedal_state=self.pedal_state,
-                shared=device_config.shared
+                shared=device_config.shared,
+                repeat_rate=repeat_rate,
+                debounce=device_config.debounce,
+                executor=self.executor
             )
             self.handlers.append(handler)
             self.device_map[device_config.path] = handler
@@ -60,8 +68,31 @@ class MultiDeviceHandler:
             handler.open()
             if handler.fd is not None:
                 devices[handler.fd] = handler
+        self.register_devices(devices)
         return devices
 
+    def register_devices(self, devices: Dict) -> None:
+        """
+        Register devices with a fresh selector, replacing any previous one
+
+        Args:
+            devices: Dictionary mapping file descriptors to handlers
+        """
+        if self.selector is not None:
+            self.selector.close()
+        self.selector = selectors.DefaultSelector()
+        for fd, handler in devices.items():
+            self.selector.register(fd, selectors.EVENT_READ, handler)
+
+    def shutdown(self) -> None:
+        """
+        Release the command worker once this handler is no longer used
+
+        Commands already queued still run; the worker thread exits after
+        the last one.
+        """
+        self.executor.shutdown(wait=False)
+
     def close_devices(self, devices: Dict) -> None:
         """
         Close all devices in the provided dictionary
@@ -69,6 +100,9 @@ class MultiDeviceHandler:
         Args:
             devices: Dictionary mapping file descriptors to handlers
         """
+        if self.selector is not None:
+            self.selector.close()
+            self.selector = None
         for handler in self.handlers:
             handler.close()
 
@@ -88,21 +122,25 @@ class MultiDeviceHandler:
         continue_processing = False
 
         try:
-            fds = list(devices.keys())
-            ready, _, _ = select(fds, [], [], 0.1)
-
-            if ready:
-                for fd in ready:
-                    handler = devices[fd]
-
-                    try:
-                        event = handler.device.read_one()
-                        if event is not None:
-                            handler.process_event(event)
-                    except (OSError, IOError):
-                        click.secho(f"Device {handler.device_path} disconnected", fg="red", err=True)
-                        handler.close()
-                        del devices[fd]
+            # Devices opened without open_devices() get registered on first use
+            if self.selector is None:
+                self.register_devices(devices)
+
+            timeout = 0.1
+            next_deadline = min((handler.debounce_deadline for handler in self.handlers), default=math.inf)
+            if next_deadline != math.inf:
+                timeout = min(timeout, max(0.0, next_deadline - time.monotonic()))
+
+            for key, _ in self.selector.select(timeout):
+                if not key.data.handle_ready():
+                    del devices[key.fd]
+                    self.selector.unregister(key.fd)
+
+            now = time.monotonic()
+            for handler in self.handlers:
+                if handler.debounce_deadline <= now:
+                    handler.flush_debounced()
+                handler.reap_children()
 
             continue_processing = len(devices) > 0
 
@@ -115,7 +153,7 @@ class MultiDeviceHandler:
         return continue_processing
 
     def read_events(self) -> None:
-        """Read events from all devices using select()"""
+        """Read events from all devices using the selector (epoll on Linux)"""
         devices = {}
         try:
             devices = self.open_devices()
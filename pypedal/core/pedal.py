@@ -1,13 +1,29 @@
 """
 Pedal state tracking functionality
 """
-from dataclasses import dataclass
-from typing import Dict, List
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Tuple
 from enum import Enum
 
 # Define the Button type
 class Button(int):
-    pass
+    """
+    Button number
+
+    Instances are interned, so Button(n) always returns the same object
+    and dict lookups keyed by buttons hit the identity fast path.
+    """
+    __slots__ = ()
+
+    def __new__(cls, number):
+        button = BUTTONS.get(number)
+        if button is None:
+            button = super().__new__(cls, number)
+            BUTTONS[int(button)] = button
+        return button
+
+# Interned Button instances by number
+BUTTONS: Dict[int, Button] = {}
 
 class ButtonEvent(Enum):
     """
@@ -20,7 +36,68 @@ class ButtonEvent(Enum):
     BUTTON_DOWN = True  # Maps to value == 1 from device events
     BUTTON_UP = False   # Maps to value == 0 from device events
 
-@dataclass
+class ButtonStates(Mapping):
+    """
+    Immutable snapshot of button states encoded as bitmasks
+
+    Bit n of pressed is set while Button(n) is held and bit n of known
+    marks the buttons being tracked. Behaves as a read-only
+    Dict[Button, ButtonEvent], so history entries and callers can keep
+    using mapping lookups, while storing a snapshot is just two ints
+    instead of a dict copy.
+    """
+    __slots__ = ('buttons', 'known', 'pressed', 'text')
+
+    def __init__(self, buttons: Tuple[Button, ...], known: int, pressed: int):
+        self.buttons = buttons
+        self.known = known
+        self.pressed = pressed
+        self.text = None
+
+    def __getitem__(self, button: Button) -> ButtonEvent:
+        # Only non-negative ints can be bit positions; anything else is
+        # simply not a key
+        if not isinstance(button, int) or button < 0 or not (self.known >> button) & 1:
+            raise KeyError(button)
+        return ButtonEvent.BUTTON_DOWN if (self.pressed >> button) & 1 else ButtonEvent.BUTTON_UP
+
+    def get(self, button: Button, default=None):
+        if not isinstance(button, int) or button < 0 or not (self.known >> button) & 1:
+            return default
+        return ButtonEvent.BUTTON_DOWN if (self.pressed >> button) & 1 else ButtonEvent.BUTTON_UP
+
+    def __iter__(self) -> Iterator[Button]:
+        return iter(self.buttons)
+
+    def __len__(self) -> int:
+        return len(self.buttons)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ButtonStates):
+            return self.known == other.known and self.pressed == other.pressed
+        return super().__eq__(other)
+
+    __hash__ = None
+
+    def copy(self) -> 'ButtonStates':
+        """Snapshots are immutable, so a copy is the snapshot itself"""
+        return self
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+    def __str__(self) -> str:
+        """
+        Format: "B1:+ B2:- B3:-" where + is pressed, - is released
+
+        buttons is kept sorted by PedalState, so no sort is needed, and
+        the text is cached for every history entry sharing this snapshot.
+        """
+        if self.text is None:
+            pressed = self.pressed
+            self.text = " ".join(f"B{b}:{'+' if (pressed >> b) & 1 else '-'}" for b in self.buttons)
+        return self.text
+
 class PedalState:
     """
     Tracks the state of all buttons on the pedal
@@ -30,12 +107,27 @@ class PedalState:
     1. Track which buttons are currently held down
     2. Provide current state snapshot for history entries
     3. Help determine when to clean up history (all buttons released)
+
+    The state is kept as a bitmask of pressed buttons, see ButtonStates.
     """
-    states: Dict[Button, ButtonEvent] = None
+    __slots__ = ('buttons', 'known', 'pressed', 'snapshots')
 
     def __init__(self, buttons: List[Button]):
         """Initialize all buttons to released state"""
-        self.states = {button: ButtonEvent.BUTTON_UP for button in buttons}
+        # Sorted so snapshots display in button order without sorting
+        self.buttons: Tuple[Button, ...] = tuple(sorted(set(Button(b) for b in buttons)))
+        self.known = 0
+        for button in self.buttons:
+            self.known |= 1 << button
+        self.pressed = 0
+        # Interned snapshots by pressed mask, shared by all history entries
+        # recorded in the same state
+        self.snapshots: Dict[int, ButtonStates] = {}
+
+    @property
+    def states(self) -> ButtonStates:
+        """Current state of all buttons as a read-only mapping"""
+        return self.get_state()
 
     def update(self, button: Button, event: ButtonEvent) -> None:
         """
@@ -44,21 +136,34 @@ class PedalState:
         Simply tracks press/release state - history tracking is handled separately.
         This separation ensures state tracking remains simple and reliable.
         """
-        self.states[button] = event
+        bit = 1 << button
+        if not self.known & bit:
+            self.buttons = tuple(sorted(self.buttons + (button,)))
+            self.known |= bit
+            self.snapshots = {}
+
+        if event is ButtonEvent.BUTTON_DOWN:
+            self.pressed |= bit
+        else:
+            self.pressed &= ~bit
 
-    def get_state(self) -> Dict[Button, ButtonEvent]:
+    def get_state(self) -> ButtonStates:
         """
         Get current state of all buttons
         
-        Returns a copy to prevent external modifications.
+        Returns an immutable snapshot to prevent external modifications.
         Used by history entries to snapshot button states at time of event.
+        Snapshots are interned per pressed mask, so repeated states share
+        one object instead of allocating a new one per event.
         """
-        return self.states.copy()
+        snapshot = self.snapshots.get(self.pressed)
+        if snapshot is None:
+            snapshot = self.snapshots[self.pressed] = ButtonStates(self.buttons, self.known, self.pressed)
+        return snapshot
 
     def __str__(self) -> str:
         """
         String representation of button states
         Format: "B1:+ B2:- B3:-" where + is pressed, - is released
         """
-        return " ".join(f"B{b}:{'+' if s == ButtonEvent.BUTTON_DOWN else '-'}" 
-                       for b, s in self.states.items())
+        return str(self.get_state())
@@ -0,0 +1,108 @@
+"""
+Configuration file change notification using Linux inotify
+"""
+import ctypes
+import ctypes.util
+import os
+import struct
+from typing import Dict, Set
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+
+# Writes in place finish with IN_CLOSE_WRITE, editors that save through a
+# temporary file and rename() finish with IN_MOVED_TO.  IN_MODIFY is left out
+# so a reload never sees a half written file.
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO
+
+INOTIFY_EVENT = struct.Struct('iIII')
+
+class ConfigWatcher:
+    """
+    Report writes to configuration files through a single inotify fd
+
+    The parent directory of each file is watched rather than the file itself
+    so the watch survives editors replacing the file.  Symlinks are resolved
+    first, so a linked config is watched where it really lives.  The fd is
+    non-blocking and can be registered with a selector.
+    """
+
+    def __init__(self):
+        """
+        Create the inotify instance
+
+        Raises:
+            OSError: If inotify is not available on this system
+        """
+        libc_name = ctypes.util.find_library('c')
+        try:
+            libc = ctypes.CDLL(libc_name, use_errno=True)
+            self.inotify_add_watch = libc.inotify_add_watch
+            inotify_init1 = libc.inotify_init1
+        except (OSError, AttributeError) as e:
+            raise OSError(f"inotify is not available: {e}")
+
+        self.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_init1: {os.strerror(errno)}")
+
+        # Watch descriptor -> watched directory
+        self.directories: Dict[int, str] = {}
+
+    def fileno(self) -> int:
+        """Return the inotify file descriptor"""
+        return self.fd
+
+    def add(self, path: str) -> None:
+        """
+        Watch the directory containing path
+
+        Args:
+            path: Configuration file to report changes for
+
+        Raises:
+            OSError: If the directory cannot be watched
+        """
+        directory = os.path.dirname(os.path.realpath(path))
+        wd = self.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_add_watch {directory}: {os.strerror(errno)}")
+        self.directories[wd] = directory
+
+    def read_changed(self) -> Set[str]:
+        """
+        Drain pending notifications
+
+        Returns:
+            Resolved paths of files written or moved into a watched directory
+        """
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 4096)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+
+                directory = self.directories.get(wd)
+                if directory is not None and name:
+                    changed.add(os.path.join(directory, os.fsdecode(name)))
+
+        return changed
+
+    def close(self) -> None:
+        """Close the inotify file descriptor"""
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
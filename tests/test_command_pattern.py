@@ -14,3 +14,27 @@ def test_pattern_parse():
     assert len(pattern.sequence) == 3
     assert pattern.command == "test_command"
     assert pattern.line_number == 1
+
+def test_usage_match():
+    """Test the compiled max_use check of implicit patterns"""
+    config = Config()
+    config.load_line("1v,2: test_command", 1)
+    pattern = config.patterns[0]
+
+    now = datetime.now()
+    history = [
+        HistoryEntry(now, Button(1), ButtonEvent.BUTTON_DOWN, {}),
+        HistoryEntry(now, Button(2), ButtonEvent.BUTTON_DOWN, {}),
+        HistoryEntry(now, Button(2), ButtonEvent.BUTTON_UP, {}),
+    ]
+    assert pattern.usage_match(history)
+
+    # Button 1 may be reused (max_use=None), button 2 may not (max_use=0)
+    history[0].used = 3
+    assert pattern.usage_match(history)
+    history[1].used = 1
+    assert not pattern.usage_match(history)
+
+    # Explicit patterns have no usage limits to check
+    config.load_line("1v,2v: other", 2)
+    assert config.patterns[1].usage_match is None
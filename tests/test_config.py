@@ -1,6 +1,7 @@
 import pytest
+import shutil
 from datetime import datetime, timedelta
-from pypedal.core.config import Config, ButtonEventPatternElement
+from pypedal.core.config import Config, ButtonEventPatternElement, parse_argv
 from pypedal.core.history import HistoryEntry
 from typing import Dict, List
 from pypedal.core.pedal import ButtonEvent
@@ -25,6 +26,14 @@ def test_device_config_parsing():
     assert device.path == "/dev/input/event0"
     assert len(device.mappings) == 6
     assert device.shared == False
+    assert device.debounce == 0.0
+
+    config.load_line("dev: /dev/input/event1 [4,5] [shared] [debounce=5]")
+    assert config.devices[1].shared == True
+    assert config.devices[1].debounce == 0.005
+
+    with pytest.raises(ValueError, match="invalid debounce"):
+        config.load_line("dev: /dev/input/event2 [6] [debounce=1.2.3]", 7)
 
 def test_multiple_device_configs():
     """Test parsing multiple device configurations"""
@@ -145,3 +154,49 @@ def test_config_load_with_timing(tmp_path):
     assert len(config.patterns[0].sequence) == 2
     assert config.patterns[0].sequence[0] == ButtonEventPatternElement(Button(1), ButtonEvent.BUTTON_DOWN)
     assert config.patterns[0].sequence[1] == ButtonEventPatternElement(Button(2), ButtonEvent.BUTTON_DOWN)
+
+def test_parse_argv_simple_commands():
+    """Test that simple commands are pre-split for direct execution"""
+    echo = shutil.which("echo")
+    assert parse_argv("echo test") == (["echo", "test"], echo)
+    assert parse_argv("echo 'quoted arg'") == (["echo", "quoted arg"], echo)
+
+    config = Config()
+    config.load_line("1v: echo 'repeat test'", 1)
+    assert config.patterns[0].argv == ["echo", "repeat test"]
+    assert config.patterns[0].executable == echo
+
+    config.load_line("2v: echo a | cat", 2)
+    assert config.patterns[1].argv is None
+    assert config.patterns[1].executable is None
+
+def test_parse_argv_requires_shell():
+    """Test that commands using shell features fall back to the shell"""
+    assert parse_argv("echo a | cat") is None
+    assert parse_argv("echo $HOME") is None
+    assert parse_argv("echo a > /dev/null") is None
+    assert parse_argv("sleep 1 && echo done") is None
+    assert parse_argv("FOO=bar echo test") is None
+    assert parse_argv("echo 'unbalanced") is None
+    assert parse_argv("no-such-command-pypedal arg") is None
+    assert parse_argv("") is None
+
+def test_patterns_by_keys():
+    """Test the exact (button, event) sequence index over patterns"""
+    config = Config()
+    config.load_line("1v: press", 1)
+    config.load_line("1^: release", 2)
+    config.load_line("1: tap", 3)
+    config.load_line("1v,1^ < 0.5: quick tap", 4)
+    config.load_line("2v: other", 5)
+
+    down = (Button(1), ButtonEvent.BUTTON_DOWN)
+    up = (Button(1), ButtonEvent.BUTTON_UP)
+    assert [p.command for p in config.get_patterns_by_keys((down,))] == ["press"]
+    assert [p.command for p in config.get_patterns_by_keys((up,))] == ["release"]
+    assert [p.command for p in config.get_patterns_by_keys((down, up))] == ["tap", "quick tap"]
+    assert config.get_patterns_by_keys(((Button(3), ButtonEvent.BUTTON_DOWN),)) == []
+
+    # Adding a pattern after a lookup invalidates the index
+    config.load_line("1v: press again", 6)
+    assert [p.command for p in config.get_patterns_by_keys((down,))] == ["press", "press again"]
@@ -1,7 +1,9 @@
+import math
+import os
 import pytest
 from unittest.mock import Mock, patch
 from datetime import datetime, timedelta
-from pypedal.core.device import DeviceHandler, Button
+from pypedal.core.device import DeviceHandler, Button, EVENT_STRUCT, READ_BATCH
 from pypedal.core.history import HistoryEntry
 from pypedal.core.pedal import ButtonEvent
 from pypedal.core.config import Config, ButtonEventPattern, ButtonEventPatternElement
@@ -65,21 +67,26 @@ def test_read_events():
     buttons = [Button(1), Button(2), Button(3)]
     handler = DeviceHandler('/dev/null', key_codes=key_codes, buttons=buttons, quiet=True)
 
-    mock_device = Mock()
-    mock_device.read_one.side_effect = [
-        create_event(1, 256, 1),
-        create_event(1, 256, 0),
-        KeyboardInterrupt,
-    ]
-    mock_device.__enter__ = Mock(return_value=mock_device)
-    mock_device.__exit__ = Mock(return_value=None)
+    read_fd, write_fd = os.pipe()
+    os.set_blocking(read_fd, False)
+    os.write(write_fd, EVENT_STRUCT.pack(0, 0, 1, 256, 1))
+    os.write(write_fd, EVENT_STRUCT.pack(0, 0, 1, 256, 0))
+
+    mock_device = Mock(fd=read_fd)
 
-    with patch('pypedal.core.device.InputDevice', return_value=mock_device):
-        try:
-            handler.read_events()
-        except KeyboardInterrupt:
-            pass
+    try:
+        with patch('pypedal.core.device.InputDevice', return_value=mock_device), \
+             patch.object(handler, 'reap_children', side_effect=KeyboardInterrupt):
+            try:
+                handler.read_events()
+            except KeyboardInterrupt:
+                pass
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
 
+    mock_device.grab.assert_called_once()
+    mock_device.close.assert_called_once()
     assert len(handler.history.entries) == 0
     assert handler.pedal_state.get_state()[Button(1)] == ButtonEvent.BUTTON_UP
 
@@ -143,6 +150,7 @@ def test_find_matching_patterns_timing():
     # Should not match due to timing
     matches = handler.find_matching_patterns()
     assert len(matches) == 0
+    assert handler.find_first_matching_pattern() is None
 
 def test_find_matching_patterns_full():
     """Test find_matching_patterns with full pattern matches"""
@@ -188,3 +196,177 @@ def test_find_matching_patterns_full():
     matches = handler.find_matching_patterns()
     assert len(matches) == 1
     assert matches[0] == pattern
+    assert handler.find_first_matching_pattern() is pattern
+
+def test_dispatch_decoded_event():
+    """Test dispatching an already decoded (type, code, value) event"""
+    key_codes = {
+        (1, 256, 1): (Button(1), False),
+        (1, 256, 0): (Button(1), False),
+    }
+    buttons = [Button(1)]
+    handler = DeviceHandler('/dev/null', key_codes=key_codes, buttons=buttons, quiet=True)
+
+    handler.dispatch(1, 256, 1)
+    assert handler.pedal_state.get_state() == {Button(1): ButtonEvent.BUTTON_DOWN}
+
+    # Unmapped events are ignored
+    handler.dispatch(0, 0, 0)
+    assert len(handler.history.entries) == 1
+
+    handler.dispatch(1, 256, 0)
+    assert handler.pedal_state.get_state() == {Button(1): ButtonEvent.BUTTON_UP}
+    assert len(handler.history.entries) == 0
+
+def test_read_pending_raw():
+    """Test reading raw input_event records from the device fd"""
+    key_codes = {
+        (1, 256, 1): (Button(1), False),
+        (1, 256, 0): (Button(1), False),
+    }
+    buttons = [Button(1)]
+    handler = DeviceHandler('/dev/null', key_codes=key_codes, buttons=buttons, quiet=True)
+
+    read_fd, write_fd = os.pipe()
+    os.set_blocking(read_fd, False)
+    handler.device = Mock(fd=read_fd)
+    try:
+        # Press and EV_SYN arrive together and are read in one batch;
+        # EV_SYN is not mapped to a button
+        os.write(write_fd, EVENT_STRUCT.pack(0, 0, 1, 256, 1) + EVENT_STRUCT.pack(0, 0, 0, 0, 0))
+        assert handler.read_pending() == 2
+        assert handler.pedal_state.get_state() == {Button(1): ButtonEvent.BUTTON_DOWN}
+        assert len(handler.history.entries) == 1
+
+        # EV_MSC is skipped before decoding since no mapping uses it
+        assert handler.event_types == {1}
+        os.write(write_fd, EVENT_STRUCT.pack(0, 0, 4, 4, 0x90001))
+        assert handler.read_pending() == 1
+        assert len(handler.history.entries) == 1
+
+        # Nothing pending
+        assert handler.read_pending() == 0
+
+        # Batches larger than the buffer are drained over several reads
+        events = [EVENT_STRUCT.pack(0, 0, 1, 256, i % 2) for i in range(READ_BATCH + 4)]
+        os.write(write_fd, b"".join(events))
+        assert handler.read_pending() == READ_BATCH
+        assert handler.read_pending() == 4
+        assert handler.pedal_state.get_state() == {Button(1): ButtonEvent.BUTTON_DOWN}
+
+        # One wakeup drains everything that is queued
+        events = [EVENT_STRUCT.pack(0, 0, 1, 256, i % 2) for i in range(2 * READ_BATCH + 1)]
+        os.write(write_fd, b"".join(events))
+        assert handler.handle_ready() is True
+        assert handler.read_pending() == 0
+        assert handler.pedal_state.get_state() == {Button(1): ButtonEvent.BUTTON_UP}
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+
+def test_key_table_lookup():
+    """Test the dense EV_KEY table and the dict fallback for other events"""
+    key_codes = {
+        (1, 258, 1): (Button(1), False),
+        (1, 258, 0): (Button(1), False),
+        (1, 260, 1): (Button(2), False),
+        (1, 260, 0): (Button(2), False),
+        (2, 8, -1): (Button(3), True),
+    }
+    buttons = [Button(1), Button(2), Button(3)]
+    handler = DeviceHandler('/dev/null', key_codes=key_codes, buttons=buttons, quiet=True)
+
+    assert handler.key_base == 258
+    assert handler.key_table[((260 - 258) << 1) | 1] == (Button(2), False)
+    assert handler.key_table[((259 - 258) << 1) | 1] is None
+
+    # Codes below, inside gaps of, and above the table are ignored
+    handler.dispatch(1, 257, 1)
+    handler.dispatch(1, 259, 1)
+    handler.dispatch(1, 261, 1)
+    assert len(handler.history.entries) == 0
+
+    handler.dispatch(1, 260, 1)
+    assert handler.pedal_state.get_state()[Button(2)] == ButtonEvent.BUTTON_DOWN
+
+    # Auto-release wheel event goes through the dict
+    with patch.object(handler.history, 'add_entry', wraps=handler.history.add_entry) as add_entry:
+        handler.dispatch(2, 8, -1)
+    assert [c.args[:2] for c in add_entry.call_args_list] == [
+        (Button(3), ButtonEvent.BUTTON_DOWN),
+        (Button(3), ButtonEvent.BUTTON_UP),
+    ]
+
+def test_dispatch_debounce():
+    """Test that bounces within the debounce interval are dropped"""
+    key_codes = {
+        (1, 256, 1): (Button(1), False),
+        (1, 256, 0): (Button(1), False),
+    }
+    handler = DeviceHandler('/dev/null', key_codes=key_codes, buttons=[Button(1)], quiet=True, debounce=0.005)
+
+    with patch.object(handler.history, 'add_entry', wraps=handler.history.add_entry) as add_entry:
+        handler.dispatch(1, 256, 1, 10.000)
+        handler.dispatch(1, 256, 0, 10.001)
+        handler.dispatch(1, 256, 1, 10.002)
+        handler.dispatch(1, 256, 0, 10.200)
+    assert [c.args[1] for c in add_entry.call_args_list] == [
+        ButtonEvent.BUTTON_DOWN,
+        ButtonEvent.BUTTON_UP,
+    ]
+    assert handler.debounce_pending == {}
+
+def test_dispatch_debounce_applies_held_change_before_next():
+    """Test that a held back change is applied when a later change arrives first"""
+    key_codes = {
+        (1, 256, 1): (Button(1), False),
+        (1, 256, 0): (Button(1), False),
+    }
+    handler = DeviceHandler('/dev/null', key_codes=key_codes, buttons=[Button(1)], quiet=True, debounce=0.005)
+
+    with patch.object(handler.history, 'add_entry', wraps=handler.history.add_entry) as add_entry:
+        handler.dispatch(1, 256, 1, 10.000)
+        handler.dispatch(1, 256, 0, 10.002)
+        handler.dispatch(1, 256, 1, 10.050)
+        handler.dispatch(1, 256, 0, 10.100)
+    assert [c.args[1] for c in add_entry.call_args_list] == [
+        ButtonEvent.BUTTON_DOWN,
+        ButtonEvent.BUTTON_UP,
+        ButtonEvent.BUTTON_DOWN,
+        ButtonEvent.BUTTON_UP,
+    ]
+    assert handler.debounce_pending == {}
+    assert handler.debounce_deadline == math.inf
+
+def test_dispatch_debounce_quick_tap():
+    """Test that a release within the debounce interval is applied when it ends"""
+    key_codes = {
+        (1, 256, 1): (Button(1), False),
+        (1, 256, 0): (Button(1), False),
+    }
+    handler = DeviceHandler('/dev/null', key_codes=key_codes, buttons=[Button(1)], quiet=True, debounce=0.005)
+
+    handler.dispatch(1, 256, 1, 10.000)
+    handler.dispatch(1, 256, 0, 10.002)
+    assert handler.pedal_state.get_state()[Button(1)] == ButtonEvent.BUTTON_DOWN
+    assert handler.debounce_deadline != math.inf
+
+    # Not due yet: nothing changes
+    handler.flush_debounced()
+    assert handler.pedal_state.get_state()[Button(1)] == ButtonEvent.BUTTON_DOWN
+
+    with patch('time.monotonic', return_value=handler.debounce_deadline):
+        handler.flush_debounced()
+    assert handler.pedal_state.get_state()[Button(1)] == ButtonEvent.BUTTON_UP
+    assert handler.debounce_deadline == math.inf
+
+    # A bounce that settles back to the current state is dropped
+    handler.dispatch(1, 256, 1, 11.000)
+    handler.dispatch(1, 256, 0, 11.001)
+    handler.dispatch(1, 256, 1, 11.002)
+    with patch('time.monotonic', return_value=handler.debounce_deadline):
+        with patch.object(handler.history, 'add_entry') as add_entry:
+            handler.flush_debounced()
+    add_entry.assert_not_called()
+    assert handler.pedal_state.get_state()[Button(1)] == ButtonEvent.BUTTON_DOWN
+
@@ -25,6 +25,10 @@ def test_multi_device_init():
         mock_open.side_effect = [mock_dev1, mock_dev2]
         handler = MultiDeviceHandler(config)
         assert len(handler.handlers) == 2
+        assert not any(h.quiet for h in handler.handlers)
+
+    quiet_handler = MultiDeviceHandler(config, quiet=True)
+    assert all(h.quiet for h in quiet_handler.handlers)
 
 def test_shared_history_across_devices():
     """Test that button history is shared across devices for pattern matching"""
@@ -189,4 +193,47 @@ def test_multi_device_button_events():
         assert handler.handlers[1].pedal_state.get_state()[Button(4)] == ButtonEvent.BUTTON_UP
         # History should be empty after pattern execution
         assert len(handler.handlers[0].history.entries) == 0
-        assert len(handler.handlers[1].history.entries) == 0
\ No newline at end of file
+        assert len(handler.handlers[1].history.entries) == 0
+
+
+def test_multi_device_process_one_cycle():
+    """Test ready devices are served through the selector and dropped on disconnect"""
+    config = Config()
+    config.load_line("dev: /dev/input/event0 [256,257,258]")
+    handler = MultiDeviceHandler(config)
+
+    read_fd, write_fd = os.pipe()
+    try:
+        device = MagicMock()
+        device.handle_ready.return_value = True
+        devices = {read_fd: device}
+
+        # Nothing readable yet
+        assert handler.process_one_cycle(devices)
+        device.handle_ready.assert_not_called()
+
+        os.write(write_fd, b"x")
+        assert handler.process_one_cycle(devices)
+        device.handle_ready.assert_called_once()
+
+        # A disconnected device is unregistered and ends processing
+        device.handle_ready.return_value = False
+        assert not handler.process_one_cycle(devices)
+        assert devices == {}
+        assert not handler.selector.get_map()
+    finally:
+        handler.close_devices({})
+        os.close(read_fd)
+        os.close(write_fd)
+
+
+def test_multi_device_shutdown():
+    """Test shutdown releases the command worker"""
+    config = Config()
+    config.load_line("dev: /dev/input/event0 [256,257,258]")
+    handler = MultiDeviceHandler(config)
+    assert all(h.executor is handler.executor for h in handler.handlers)
+
+    handler.shutdown()
+    with pytest.raises(RuntimeError):
+        handler.executor.submit(print)
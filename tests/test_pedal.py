@@ -1,8 +1,10 @@
 """
 Test button state and history tracking
 """
+import pytest
 from datetime import datetime
-from pypedal.core.pedal import PedalState, ButtonEvent
+from unittest.mock import patch
+from pypedal.core.pedal import PedalState, ButtonEvent, ButtonStates
 from pypedal.core.history import HistoryEntry, History
 from pypedal.core.device import Button
 
@@ -20,6 +22,52 @@ def test_button_state():
     assert state.states[Button(2)] == ButtonEvent.BUTTON_UP
     assert state.states[Button(3)] == ButtonEvent.BUTTON_UP
 
+def test_button_states_bitmask():
+    """Test the bitmask-backed state snapshot"""
+    state = PedalState(buttons=[Button(1), Button(2), Button(3)])
+    state.update(Button(2), ButtonEvent.BUTTON_DOWN)
+
+    snapshot = state.get_state()
+    assert isinstance(snapshot, ButtonStates)
+    assert snapshot.pressed == 1 << 2
+    assert snapshot == {Button(1): ButtonEvent.BUTTON_UP, Button(2): ButtonEvent.BUTTON_DOWN, Button(3): ButtonEvent.BUTTON_UP}
+    assert list(snapshot) == [Button(1), Button(2), Button(3)]
+    assert snapshot.get(Button(4)) is None
+    assert snapshot.copy() is snapshot
+
+    # Keys that cannot be buttons are missing, as for any Mapping
+    assert "1" not in snapshot
+    assert -1 not in snapshot
+    assert snapshot.get("1") is None
+    assert snapshot.get(-1, "missing") == "missing"
+    with pytest.raises(KeyError):
+        snapshot["1"]
+    with pytest.raises(KeyError):
+        snapshot[-1]
+
+    # Later updates do not change an earlier snapshot
+    state.update(Button(2), ButtonEvent.BUTTON_UP)
+    assert snapshot[Button(2)] == ButtonEvent.BUTTON_DOWN
+    assert state.get_state()[Button(2)] == ButtonEvent.BUTTON_UP
+
+    # Returning to a state reuses its snapshot
+    state.update(Button(2), ButtonEvent.BUTTON_DOWN)
+    assert state.get_state() is snapshot
+    assert str(state) == "B1:- B2:+ B3:-"
+    assert str(snapshot) == "B1:- B2:+ B3:-"
+
+    # Buttons are kept in order even when first seen out of order
+    state = PedalState(buttons=[Button(3), Button(1)])
+    state.update(Button(2), ButtonEvent.BUTTON_DOWN)
+    assert str(state) == "B1:- B2:+ B3:-"
+
+def test_button_interned():
+    """Test that buttons with the same number are the same object"""
+    assert Button(1) is Button(1)
+    assert Button(Button(2)) is Button(2)
+    assert Button(1) == 1
+    assert Button(1) is not Button(2)
+
 def test_history_entry():
     """Test history entry creation"""
     now = datetime.now()
@@ -31,6 +79,18 @@ def test_history_entry():
     assert entry.event == ButtonEvent.BUTTON_DOWN
     assert entry.button_states == button_states
 
+def test_history_entry_str():
+    """Test that only the used counter is reformatted after first display"""
+    button_states = {Button(1): ButtonEvent.BUTTON_DOWN, Button(2): ButtonEvent.BUTTON_UP}
+    entry = HistoryEntry(datetime(2024, 1, 1, 12, 0, 0, 250000), Button(1), ButtonEvent.BUTTON_DOWN, button_states)
+
+    text = str(entry)
+    assert text.startswith("12:00:00.250 B1 ")
+    assert text.endswith("| B1:+ B2:- (used:0)")
+
+    entry.used = 2
+    assert str(entry) == text.replace("(used:0)", "(used:2)")
+
 def test_history_basic():
     """Test basic history functionality"""
     history = History()
@@ -63,6 +123,76 @@ def test_history_sequence():
     assert history.entries[2].button == Button(2)
     assert history.entries[2].event == ButtonEvent.BUTTON_UP
 
+def test_history_all_buttons():
+    """Test that history tracks every button seen in state snapshots"""
+    history = History()
+    state = PedalState(buttons=[Button(1), Button(2)])
+    history.add_entry(Button(1), ButtonEvent.BUTTON_DOWN, state.get_state())
+    history.add_entry(Button(1), ButtonEvent.BUTTON_UP, state.get_state())
+    assert history.all_buttons == [Button(1), Button(2)]
+
+    history.add_entry(Button(3), ButtonEvent.BUTTON_DOWN, {Button(3): ButtonEvent.BUTTON_DOWN})
+    assert history.all_buttons == [Button(1), Button(2), Button(3)]
+
+def test_history_version():
+    """Test that history versions change on mutation and never repeat"""
+    first = History()
+    second = History()
+    assert first.version != second.version
+
+    version = first.version
+    first.add_entry(Button(1), ButtonEvent.BUTTON_DOWN, {Button(1): ButtonEvent.BUTTON_DOWN})
+    assert first.version > version
+
+    # Nothing released, nothing popped, version unchanged
+    version = first.version
+    first.pop_released({Button(1): ButtonEvent.BUTTON_DOWN})
+    assert first.version == version
+
+def test_history_empty_callbacks():
+    """Test on_nonempty/on_empty fire only on empty transitions"""
+    history = History()
+    calls = []
+    history.on_nonempty = lambda: calls.append('nonempty')
+    history.on_empty = lambda: calls.append('empty')
+
+    states = {Button(1): ButtonEvent.BUTTON_DOWN, Button(2): ButtonEvent.BUTTON_DOWN}
+    history.add_entry(Button(1), ButtonEvent.BUTTON_DOWN, states)
+    history.add_entry(Button(2), ButtonEvent.BUTTON_DOWN, states)
+    assert calls == ['nonempty']
+
+    history.pop_released(states)
+    assert calls == ['nonempty']
+
+    history.pop_released({Button(1): ButtonEvent.BUTTON_UP, Button(2): ButtonEvent.BUTTON_UP})
+    assert calls == ['nonempty', 'empty']
+
+def test_history_time_span():
+    """Test the time span between the first and last history entry"""
+    history = History()
+    states = {Button(1): ButtonEvent.BUTTON_DOWN}
+    assert history.time_span() == 0.0
+
+    history.add_entry(Button(1), ButtonEvent.BUTTON_DOWN, states, datetime(2024, 1, 1, 12, 0, 0))
+    assert history.time_span() == 0.0
+
+    history.add_entry(Button(1), ButtonEvent.BUTTON_UP, states, datetime(2024, 1, 1, 12, 0, 1, 500000))
+    assert history.time_span() == 1.5
+
+    # Without explicit timestamps entries are timed by the monotonic clock
+    history = History()
+    with patch('time.monotonic', side_effect=[100.0, 100.25]):
+        history.add_entry(Button(1), ButtonEvent.BUTTON_DOWN, states)
+        history.add_entry(Button(1), ButtonEvent.BUTTON_UP, states)
+    assert history.time_span() == 0.25
+
+    # Explicit and implicit timestamps share the monotonic clock
+    history = History()
+    now = datetime.now()
+    history.add_entry(Button(1), ButtonEvent.BUTTON_DOWN, states, now)
+    history.add_entry(Button(1), ButtonEvent.BUTTON_UP, states)
+    assert abs(history.time_span()) < 1.0
+
 def test_history_cleanup():
     """Test history cleanup when buttons are released"""
     history = History()
@@ -80,9 +210,16 @@ def test_history_cleanup():
     states[Button(2)] = ButtonEvent.BUTTON_UP
     history.add_entry(Button(2), ButtonEvent.BUTTON_UP, states.copy())
 
+    assert history.event_keys == (
+        (Button(1), ButtonEvent.BUTTON_DOWN),
+        (Button(2), ButtonEvent.BUTTON_DOWN),
+        (Button(2), ButtonEvent.BUTTON_UP),
+    )
+
     # Should keep B1, still pressed
     history.pop_released(states)
     assert len(history.entries) == 1
+    assert history.event_keys == ((Button(1), ButtonEvent.BUTTON_DOWN),)
 
     # Release B1
     states[Button(1)] = ButtonEvent.BUTTON_UP
@@ -91,6 +228,7 @@ def test_history_cleanup():
     # Should clear all entries since no buttons pressed
     history.pop_released(states)
     assert len(history.entries) == 0
+    assert history.event_keys == ()
 
 def test_history_state_tracking():
     """Test that history tracks button states correctly"""
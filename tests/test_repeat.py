@@ -1,9 +1,10 @@
+import math
 import pytest
 import time
 import subprocess
 from unittest.mock import Mock, patch, call
 from pypedal.core.config import Config
-from pypedal.core.device import DeviceHandler
+from pypedal.core.device import DeviceHandler, MAX_PENDING_COMMANDS
 from pypedal.core.pedal import Button, ButtonEvent, PedalState
 from pypedal.core.history import History
 
@@ -64,52 +65,55 @@ def test_check_and_fire_repeats_no_history(device_handler):
     assert len(repeat_patterns) == 0
 
     device_handler.check_and_fire_repeats(0.1)
-    assert device_handler.last_repeat_time is None
+    assert device_handler.repeat_deadline == math.inf
 
 def test_check_and_fire_repeats_first_fire(device_handler):
     """Test that first repeat doesn't fire until 2x interval has elapsed"""
     device_handler.history.add_entry(Button(1), ButtonEvent.BUTTON_DOWN, {Button(1): ButtonEvent.BUTTON_DOWN})
-    device_handler.last_repeat_time = -time.monotonic()
+    device_handler.repeat_deadline = time.monotonic() + 0.2
 
     repeat_patterns = device_handler.find_repeat_patterns()
     assert len(repeat_patterns) == 1
     assert repeat_patterns[0].repeat is True
 
-    with patch('subprocess.run') as mock_run:
+    with patch('subprocess.Popen') as mock_run:
         device_handler.check_and_fire_repeats(0.1)
         mock_run.assert_not_called()
 
         time.sleep(0.21)
         device_handler.check_and_fire_repeats(0.1)
         mock_run.assert_called_once()
-        assert device_handler.last_repeat_time > 0
+        assert time.monotonic() < device_handler.repeat_deadline <= time.monotonic() + 0.1
 
 def test_check_and_fire_repeats_interval_not_elapsed(device_handler):
     """Test that repeat doesn't fire when interval hasn't elapsed"""
     device_handler.history.add_entry(Button(1), ButtonEvent.BUTTON_DOWN, {Button(1): ButtonEvent.BUTTON_DOWN})
-    device_handler.last_repeat_time = time.monotonic()
+    device_handler.repeat_deadline = time.monotonic() + 0.1
 
-    with patch('subprocess.run') as mock_run:
+    with patch('subprocess.Popen') as mock_run:
         device_handler.check_and_fire_repeats(0.1)
         mock_run.assert_not_called()
 
 def test_check_and_fire_repeats_interval_elapsed(device_handler):
     """Test that repeat fires when interval has elapsed"""
     device_handler.history.add_entry(Button(1), ButtonEvent.BUTTON_DOWN, {Button(1): ButtonEvent.BUTTON_DOWN})
-    device_handler.last_repeat_time = time.monotonic() - 0.15
+    device_handler.repeat_deadline = time.monotonic() - 0.05
 
-    with patch('subprocess.run') as mock_run:
+    with patch('subprocess.Popen') as mock_run:
         device_handler.check_and_fire_repeats(0.1)
         mock_run.assert_called_once()
-        assert "echo 'repeat test'" in str(mock_run.call_args)
+        assert mock_run.call_args.args == (['echo', 'repeat test'],)
+        assert mock_run.call_args.kwargs['shell'] is False
+        assert mock_run.call_args.kwargs['executable'].endswith('/echo')
+        assert mock_run.call_args.kwargs['close_fds'] is False
 
 def test_check_and_fire_repeats_timer_reset_on_clear(device_handler):
     """Test that timer resets when no repeat patterns match"""
     device_handler.history.add_entry(Button(2), ButtonEvent.BUTTON_DOWN, {Button(2): ButtonEvent.BUTTON_DOWN})
-    device_handler.last_repeat_time = time.monotonic()
+    device_handler.repeat_deadline = time.monotonic()
 
     device_handler.check_and_fire_repeats(0.1)
-    assert device_handler.last_repeat_time is None
+    assert device_handler.repeat_deadline == math.inf
 
 def test_find_repeat_patterns_ignores_non_repeat(device_handler):
     """Test that find_repeat_patterns only returns patterns with repeat=True"""
@@ -126,27 +130,62 @@ def test_process_event_sets_timer_for_repeat_pattern(device_handler):
     mock_event.code = 1
     mock_event.value = 1
 
-    assert device_handler.last_repeat_time is None
+    assert device_handler.repeat_deadline == math.inf
 
-    with patch('subprocess.run'):
+    with patch('subprocess.Popen'):
+        before = time.monotonic()
         device_handler.process_event(mock_event)
 
-    assert device_handler.last_repeat_time is not None
-    assert device_handler.last_repeat_time < 0
+    # First repeat is armed at 2x the handler's repeat rate
+    assert before + 0.2 <= device_handler.repeat_deadline <= time.monotonic() + 0.2
 
 def test_repeat_command_failure_doesnt_crash(device_handler):
     """Test that command failure in repeat doesn't terminate loop"""
     device_handler.history.add_entry(Button(1), ButtonEvent.BUTTON_DOWN, {Button(1): ButtonEvent.BUTTON_DOWN})
+    device_handler.repeat_deadline = time.monotonic() - 0.05
 
-    with patch('subprocess.run', side_effect=subprocess.CalledProcessError(1, "echo 'repeat test'")):
+    with patch('subprocess.Popen') as mock_popen:
+        mock_popen.return_value.poll.return_value = 1
         device_handler.check_and_fire_repeats(0.1)
+        assert len(device_handler.children) == 1
+
+        device_handler.reap_children()
+        assert device_handler.children == []
+
+def test_repeat_command_does_not_wait(device_handler):
+    """Test that repeat commands are started without waiting for completion"""
+    device_handler.history.add_entry(Button(1), ButtonEvent.BUTTON_DOWN, {Button(1): ButtonEvent.BUTTON_DOWN})
+    device_handler.repeat_deadline = time.monotonic() - 0.05
+
+    with patch('subprocess.Popen') as mock_popen, patch('subprocess.run') as mock_run:
+        mock_popen.return_value.poll.return_value = None
+        device_handler.check_and_fire_repeats(0.1)
+        mock_run.assert_not_called()
+        mock_popen.return_value.wait.assert_not_called()
+
+        # Still running, so reaping keeps the child
+        device_handler.reap_children()
+        assert len(device_handler.children) == 1
+
+def test_async_flag_parsing():
+    """Test that repeat implies async and async can be set on its own"""
+    config = Config()
+    config.load_line("1v repeat: echo repeat", 1)
+    config.load_line("2v async: echo async", 2)
+    config.load_line("3v: echo sync", 3)
+    config.load_line("1v,2 < 0.5 async: echo timed", 4)
+
+    assert [p.async_ for p in config.patterns] == [True, True, False, True]
+    assert [p.repeat for p in config.patterns] == [True, False, False, False]
+    assert config.patterns[1].command == "echo async"
+    assert config.patterns[3].time_constraint == 0.5
 
 def test_multiple_repeat_cycles(device_handler):
     """Test that repeats fire multiple times at correct intervals"""
     device_handler.history.add_entry(Button(1), ButtonEvent.BUTTON_DOWN, {Button(1): ButtonEvent.BUTTON_DOWN})
-    device_handler.last_repeat_time = -time.monotonic()
+    device_handler.repeat_deadline = time.monotonic() + 0.1
 
-    with patch('subprocess.run') as mock_run:
+    with patch('subprocess.Popen') as mock_run:
         time.sleep(0.11)
         device_handler.check_and_fire_repeats(0.05)
         assert mock_run.call_count == 1
@@ -158,3 +197,47 @@ def test_multiple_repeat_cycles(device_handler):
         time.sleep(0.06)
         device_handler.check_and_fire_repeats(0.05)
         assert mock_run.call_count == 3
+
+def test_sync_command_queued_off_event_loop(device_handler):
+    """Test that synchronous commands run on the worker and failures are reaped"""
+    mock_event = Mock()
+    mock_event.type = 1
+    mock_event.code = 2
+    mock_event.value = 1
+
+    with patch('subprocess.run') as mock_run:
+        mock_run.side_effect = subprocess.CalledProcessError(1, ['echo', 'no repeat'])
+        device_handler.process_event(mock_event)
+        assert len(device_handler.pending) == 1
+
+        device_handler.wait_for_commands()
+        mock_run.assert_called_once()
+        assert mock_run.call_args.kwargs['check'] is True
+        assert device_handler.pending == []
+
+def test_async_commands_capped(device_handler):
+    """Test that running asynchronous commands are capped like queued ones"""
+    pattern = device_handler.config.patterns[0]
+    assert pattern.async_
+
+    with patch('subprocess.Popen') as mock_popen:
+        mock_popen.return_value.poll.return_value = None
+        for _ in range(MAX_PENDING_COMMANDS + 3):
+            device_handler.run_command(pattern)
+        assert mock_popen.call_count == MAX_PENDING_COMMANDS
+        assert len(device_handler.children) == MAX_PENDING_COMMANDS
+
+        # Finished children make room again
+        mock_popen.return_value.poll.return_value = 0
+        device_handler.run_command(pattern)
+        assert mock_popen.call_count == MAX_PENDING_COMMANDS + 1
+
+def test_repeat_patterns_cached_until_history_changes(device_handler):
+    """Test that repeat lookups are reused until the history is modified"""
+    device_handler.history.add_entry(Button(1), ButtonEvent.BUTTON_DOWN, {Button(1): ButtonEvent.BUTTON_DOWN})
+    first = device_handler.find_repeat_patterns()
+    assert len(first) == 1
+    assert device_handler.find_repeat_patterns() is first
+
+    device_handler.history.add_entry(Button(1), ButtonEvent.BUTTON_UP, {Button(1): ButtonEvent.BUTTON_UP})
+    assert device_handler.find_repeat_patterns() == []
@@ -1,4 +1,5 @@
 """Helper functions for testing button sequences"""
+import shlex
 import pytest
 from unittest.mock import Mock, patch
 from pypedal.core.device import DeviceHandler, Button
@@ -44,8 +45,9 @@ def run_button_sequence(config_lines, button_events, expected_commands):
     events = [create_event(1, code, value) for code, value in button_events]
 
     with patch('subprocess.run') as mock_run:
-        def capture_command(cmd, shell=True, check=True):
-            executed_commands.append(cmd)
+        def capture_command(cmd, shell=True, check=True, **kwargs):
+            # Simple commands are executed as argv without a shell
+            executed_commands.append(cmd if shell else shlex.join(cmd))
             return Mock()
         
         mock_run.side_effect = capture_command
@@ -53,6 +55,7 @@ def run_button_sequence(config_lines, button_events, expected_commands):
         # Process each event in the sequence
         for event in events:
             handler.process_event(event)
+        handler.wait_for_commands()
 
     print("\nExecuted commands:")
     print(executed_commands)
@@ -0,0 +1,46 @@
+"""
+Tests for configuration file change notification
+"""
+import os
+import pytest
+from pypedal.core.watch import ConfigWatcher
+
+@pytest.fixture
+def watcher():
+    """Fixture providing a ConfigWatcher, skipped where inotify is unavailable"""
+    try:
+        watcher = ConfigWatcher()
+    except OSError as e:
+        pytest.skip(str(e))
+    yield watcher
+    watcher.close()
+
+def test_watcher_reports_writes(watcher, tmp_path):
+    """Test writes and renames into the watched directory are reported"""
+    config_file = tmp_path / "pedal.conf"
+    config_file.write_text("dev: /dev/input/event0 [1,2,3]\n")
+    watcher.add(str(config_file))
+
+    assert watcher.read_changed() == set()
+
+    config_file.write_text("dev: /dev/input/event1 [1,2,3]\n")
+    assert str(config_file) in watcher.read_changed()
+
+    replacement = tmp_path / "pedal.conf.tmp"
+    replacement.write_text("dev: /dev/input/event2 [1,2,3]\n")
+    os.rename(replacement, config_file)
+    assert str(config_file) in watcher.read_changed()
+    assert watcher.read_changed() == set()
+
+def test_watcher_resolves_symlinks(watcher, tmp_path):
+    """Test a symlinked config reports writes under its resolved path"""
+    target_dir = tmp_path / "dotfiles"
+    target_dir.mkdir()
+    target = target_dir / "pedal.conf"
+    target.write_text("dev: /dev/input/event0 [1,2,3]\n")
+    link = tmp_path / "pedal.conf"
+    link.symlink_to(target)
+    watcher.add(str(link))
+
+    link.write_text("dev: /dev/input/event1 [1,2,3]\n")
+    assert os.path.realpath(link) in watcher.read_changed()